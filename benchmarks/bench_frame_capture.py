@@ -0,0 +1,62 @@
+"""
+Per-frame capture cost: PNG encode/decode round trip vs. reading the Agg
+canvas RGBA buffer directly.
+
+Run from the repository root:
+    python benchmarks/bench_frame_capture.py
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import imageio.v2 as imageio
+import matplotlib.pyplot as plt
+import numpy as np
+
+from creating_patterns import capture_frame, compute_animation_geometry
+
+FRAMES = 40
+
+
+def png_round_trip(fig):
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png')
+    buf.seek(0)
+    return imageio.imread(buf)
+
+
+def agg_buffer(fig):
+    return capture_frame(fig).copy()
+
+
+def time_capture(capture, dpi):
+    path = compute_animation_geometry([27], 30, 45)[0]
+    fig, ax = plt.subplots(figsize=(15, 15), dpi=dpi)
+    ax.axis('off')
+    line, = ax.plot([], [], lw=3, alpha=0.9)
+    start = time.perf_counter()
+    for i in range(FRAMES):
+        line.set_data(path['x'][:i + 2], path['y'][:i + 2])
+        xmin, xmax, ymin, ymax = path['limits'][i]
+        ax.set_xlim(xmin, xmax)
+        ax.set_ylim(ymin, ymax)
+        frame = capture(fig)
+    elapsed = time.perf_counter() - start
+    plt.close(fig)
+    assert frame.shape[2] == 4 and frame.dtype == np.uint8
+    return elapsed / FRAMES
+
+
+def main():
+    print(f"{'dpi':>4} {'png ms/frame':>13} {'agg ms/frame':>13} {'saving':>7}")
+    for dpi in (50, 100):
+        png = time_capture(png_round_trip, dpi)
+        agg = time_capture(agg_buffer, dpi)
+        print(f"{dpi:>4} {png * 1000:>13.2f} {agg * 1000:>13.2f} {1 - agg / png:>7.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+GIF encode cost and output size: adaptive palette per full frame vs. one
+global palette with delta (changed sub-rectangle) frames.
+
+Run from the repository root:
+    python benchmarks/bench_gif_encoding.py
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from creating_patterns import animation_palette, generate_combined_turtle_animation
+from gif_stream import GifStreamWriter
+
+SERIES = [27, 97, 871]
+MAX_FRAMES = 200
+
+
+def encode(dpi, palette):
+    """Return (encode CPU seconds, output bytes); rendering time is excluded."""
+    output = io.BytesIO()
+    cpu = 0.0
+    with GifStreamWriter(output, palette=palette) as writer:
+        frames = generate_combined_turtle_animation(SERIES, 30, 45, dpi=dpi)
+        for count, (frame, duration) in enumerate(frames):
+            if count == MAX_FRAMES:
+                break
+            start = time.process_time()
+            writer.append(frame, duration)
+            cpu += time.process_time() - start
+    return cpu, len(output.getvalue())
+
+
+def main():
+    palette = animation_palette(len(SERIES))
+    print(f"{'dpi':>4} {'encoder':>15} {'encode CPU s':>13} {'MB':>7}")
+    for dpi in (50, 100):
+        adaptive_cpu, adaptive_size = encode(dpi, None)
+        delta_cpu, delta_size = encode(dpi, palette)
+        print(f"{dpi:>4} {'adaptive':>15} {adaptive_cpu:>13.2f} {adaptive_size / 1e6:>7.2f}")
+        print(f"{dpi:>4} {'global + delta':>15} {delta_cpu:>13.2f} {delta_size / 1e6:>7.2f}")
+        print(f"{'':>4} {'saving':>15} {1 - delta_cpu / adaptive_cpu:>13.0%} "
+              f"{1 - delta_size / adaptive_size:>7.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Cold-start benchmark: how long a fresh interpreter takes to import the app,
+answer its first page and finish its first render.
+
+Every measurement runs in a new Python process started in the repository
+root, so it sees the real Collatz store and render cache, and the median of
+--runs is reported. --modules lists the app's slowest direct imports by
+cumulative time (python -X importtime).
+
+Run from the repository root:
+    python benchmarks/bench_import.py [--runs 7] [--modules]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each snippet prints the seconds it measured, one per line.
+SNIPPETS = {
+    "import": """
+import time
+start = time.perf_counter()
+import creating_patterns
+print(time.perf_counter() - start)
+""",
+    "first page": """
+import time
+start = time.perf_counter()
+import creating_patterns
+creating_patterns.app.test_client().get("/")
+print(time.perf_counter() - start)
+""",
+    "first render": """
+import os, tempfile, time
+start = time.perf_counter()
+import creating_patterns
+params = creating_patterns.parse_render_params({"series_type": "fibonacci", "cap": "3",
+                                                "low_quality": "on"})
+with tempfile.TemporaryDirectory() as tmp:
+    creating_patterns.render_animation(params, os.path.join(tmp, "out.gif"))
+print(time.perf_counter() - start)
+""",
+    "import + warm_up": """
+import time
+start = time.perf_counter()
+import creating_patterns
+warm_up = getattr(creating_patterns, "warm_up", None)
+if warm_up is not None:
+    warm_up()
+print(time.perf_counter() - start)
+""",
+}
+
+
+def measure(snippet, runs):
+    times = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", snippet], cwd=ROOT, check=True,
+                             capture_output=True, text=True).stdout
+        times.append(float(out.split()[-1]))
+    return statistics.median(times), min(times)
+
+
+def slowest_modules(count=15):
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import creating_patterns"],
+                         cwd=ROOT, check=True, capture_output=True, text=True).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Names are indented two spaces per level; keep the app's direct imports.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            rows.append((int(cumulative), name.strip()))
+    top = sorted(rows, reverse=True)
+    return top[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--modules", action="store_true", help="list the app's slowest imports")
+    args = parser.parse_args()
+    print(f"{'measurement':<18}{'median':>10}{'best':>10}")
+    for name, snippet in SNIPPETS.items():
+        median, best = measure(snippet, args.runs)
+        print(f"{name:<18}{median:>9.3f}s{best:>9.3f}s")
+    if args.modules:
+        print("\nslowest imports (cumulative):")
+        for micros, name in slowest_modules():
+            print(f"  {micros / 1e6:7.3f}s {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Frame rendering throughput of the matplotlib and raster canvas backends,
+including GIF frame encoding.
+
+Run from the repository root:
+    python benchmarks/bench_renderers.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from creating_patterns import RENDERERS, compute_animation_geometry, path_colors, render_frames
+from gif_stream import encode_frame
+
+SERIES = [27, 97, 871]
+MAX_FRAMES = 150
+
+
+def time_renderer(renderer, dpi, encode):
+    paths = compute_animation_geometry(SERIES, 30, 45)
+    colors = path_colors(len(paths))
+    start = time.perf_counter()
+    count = 0
+    for frame, duration in render_frames(paths, colors, dpi=dpi, stop=MAX_FRAMES,
+                                         renderer=renderer):
+        if encode:
+            encode_frame(frame, duration)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    print(f"{'dpi':>4} {'renderer':>11} {'render fps':>11} {'render+encode fps':>18}")
+    for dpi in (50, 100):
+        for renderer in RENDERERS:
+            render = time_renderer(renderer, dpi, encode=False)
+            total = time_renderer(renderer, dpi, encode=True)
+            print(f"{dpi:>4} {renderer:>11} {render:>11.1f} {total:>18.1f}")
+
+
+if __name__ == '__main__':
+    main()
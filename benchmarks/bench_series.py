@@ -0,0 +1,52 @@
+"""
+Series engine timings: cold generation (empty memo) and memoized lookups for
+every registered series, plus the sieve against the old trial-division primes.
+
+Run from the repository root:
+    python benchmarks/bench_series.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from creating_patterns import SERIES_REGISTRY, _series_memo, generate_series
+
+CAPS = (10, 100, 1000)
+
+
+def trial_division_primes(n):
+    primes = []
+    candidate = 2
+    while len(primes) < n:
+        if all(candidate % i for i in range(2, int(candidate ** 0.5) + 1)):
+            primes.append(candidate)
+        candidate += 1
+    return primes
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    print(f"{'series':>14} {'cap':>6} {'cold ms':>9} {'memo ms':>9}")
+    for name in SERIES_REGISTRY:
+        for cap in CAPS:
+            _series_memo[name].clear()
+            cold = timed(generate_series, name, cap)
+            warm = timed(generate_series, name, cap)
+            print(f"{name:>14} {cap:>6} {cold:>9.3f} {warm:>9.3f}")
+    print()
+    for cap in (1000, 10000):
+        _series_memo["primes"].clear()
+        sieve = timed(generate_series, "primes", cap)
+        trial = timed(trial_division_primes, cap)
+        print(f"primes({cap}): sieve {sieve:.2f} ms, trial division {trial:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
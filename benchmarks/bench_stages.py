@@ -0,0 +1,243 @@
+"""
+Stage-level render benchmark with regression baselines.
+
+Runs a fixed matrix of parameter sets (every series type, several caps, each
+angle mode, both dpi values, mirror on and off) and times every stage of a
+render separately: series generation, Collatz lookup, geometry,
+rasterization, frame capture and GIF encoding. Each case runs --repeat times
+and keeps the fastest time per stage, which is far steadier than one run.
+Output size and peak memory are recorded too. Memory is traced with
+tracemalloc in a separate short pass so tracing does not skew the timings;
+it covers Python and NumPy allocations (repeatable, unlike resident set
+size) but not matplotlib's own Agg buffer. Results are written as JSON;
+`compare` flags cases that got slower, bigger or hungrier than a baseline.
+
+Run from the repository root:
+    python benchmarks/bench_stages.py run [--quick] [--repeat 3] [--out results.json]
+    python benchmarks/bench_stages.py compare baseline.json results.json [--threshold 0.25]
+
+`compare` exits with status 1 when it finds a regression.
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+import numpy as np
+import PIL
+
+import creating_patterns
+from collatz_store import CollatzStore
+from creating_patterns import (RENDERERS, SERIES_REGISTRY, MatplotlibCanvas, _series_memo,
+                               animation_palette, compute_animation_geometry,
+                               generate_series, path_colors, render_frames)
+from gif_stream import GifStreamWriter
+
+STAGES = ("series", "collatz", "geometry", "rasterize", "capture", "encode")
+ANGLE_MODES = {
+    "fixed": {},
+    "custom_transform": {"custom_transform": True, "left_mod": 90, "right_mod": 120},
+    "consecutive_increment": {"consecutive_increment": True},
+}
+MATRIX = {
+    "series_type": list(SERIES_REGISTRY),
+    "cap": [3, 8],
+    "angle_mode": list(ANGLE_MODES),
+    "dpi": [50, 100],
+    "symmetry_mirror": ["None", "Horizontal"],
+}
+QUICK_MATRIX = dict(MATRIX, cap=[5], angle_mode=["fixed", "custom_transform"], dpi=[50])
+MAX_FRAMES = 60  # Keeps long sequences (factorials) from dominating the run
+MEMORY_FRAMES = 5  # Frames rendered in the memory pass; buffers peak within the first few
+MIN_SECONDS = 0.005  # Stage differences below this are treated as noise
+
+
+class TimedCanvas(MatplotlibCanvas):
+    """MatplotlibCanvas that splits capture() into drawing and reading the buffer."""
+
+    draw_seconds = 0.0
+    read_seconds = 0.0
+
+    def capture(self):
+        start = time.perf_counter()
+        self.fig.canvas.draw()
+        drawn = time.perf_counter()
+        frame = np.asarray(self.fig.canvas.buffer_rgba())
+        TimedCanvas.draw_seconds += drawn - start
+        TimedCanvas.read_seconds += time.perf_counter() - drawn
+        return frame
+
+
+def case_id(case):
+    return ("{series_type}-cap{cap}-{angle_mode}-dpi{dpi}-mirror{symmetry_mirror}"
+            .format(**case))
+
+
+def render_case(case, store_path, stages, stop=None):
+    """Run one render stage by stage, adding each stage's seconds to stages."""
+    _series_memo[case["series_type"]].clear()
+    start = time.perf_counter()
+    main_series = generate_series(case["series_type"], case["cap"])
+    stages["series"] += time.perf_counter() - start
+
+    # A fresh store per run, so the lookup is always a cold walk.
+    creating_patterns.collatz_cache = CollatzStore(store_path)
+    start = time.perf_counter()
+    creating_patterns.collatz_cache.sequences(main_series)
+    stages["collatz"] += time.perf_counter() - start
+
+    start = time.perf_counter()
+    paths = compute_animation_geometry(main_series, 30, 45,
+                                       symmetry_mirror=case["symmetry_mirror"],
+                                       max_frames=MAX_FRAMES, **ANGLE_MODES[case["angle_mode"]])
+    stages["geometry"] += time.perf_counter() - start
+
+    colors = path_colors(len(paths))
+    output = io.BytesIO()
+    TimedCanvas.draw_seconds = TimedCanvas.read_seconds = 0.0
+    encode = 0.0
+    start = time.perf_counter()
+    with GifStreamWriter(output, palette=animation_palette(len(paths))) as writer:
+        for frame, duration in render_frames(paths, colors, dpi=case["dpi"], stop=stop,
+                                             renderer="timed"):
+            encode_start = time.perf_counter()
+            writer.append(frame, duration)
+            encode += time.perf_counter() - encode_start
+    loop = time.perf_counter() - start
+    # Rasterizing covers the artist updates as well as the Agg draw.
+    stages["encode"] += encode
+    stages["capture"] += TimedCanvas.read_seconds
+    stages["rasterize"] += loop - encode - TimedCanvas.read_seconds
+    return writer.frame_count, len(output.getvalue())
+
+
+def run_case(case, store_dir, repeat):
+    stages = dict.fromkeys(STAGES, float("inf"))
+    for attempt in range(repeat):
+        timings = dict.fromkeys(STAGES, 0.0)
+        frames, output_bytes = render_case(case, os.path.join(store_dir, f"{case_id(case)}-{attempt}"),
+                                           timings)
+        stages = {name: min(stages[name], timings[name]) for name in STAGES}
+    tracemalloc.start()
+    try:
+        render_case(case, os.path.join(store_dir, case_id(case) + "-memory"),
+                    dict.fromkeys(STAGES, 0.0), stop=MEMORY_FRAMES)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "params": case,
+        "frames": frames,
+        "stages": {name: round(seconds, 6) for name, seconds in stages.items()},
+        "total": round(sum(stages.values()), 6),
+        "peak_memory_bytes": peak_memory,
+        "output_bytes": output_bytes,
+    }
+
+
+def run(args):
+    matrix = QUICK_MATRIX if args.quick else MATRIX
+    names = list(matrix)
+    cases = [dict(zip(names, values)) for values in itertools.product(*matrix.values())]
+    RENDERERS["timed"] = TimedCanvas
+    results = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "quick": args.quick,
+            "repeat": args.repeat,
+            "max_frames": MAX_FRAMES,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "matplotlib": matplotlib.__version__,
+            "pillow": PIL.__version__,
+            "machine": platform.machine(),
+        },
+        "cases": {},
+    }
+    original_store = creating_patterns.collatz_cache
+    try:
+        with tempfile.TemporaryDirectory() as store_dir:
+            for i, case in enumerate(cases, 1):
+                result = run_case(case, store_dir, args.repeat)
+                results["cases"][case_id(case)] = result
+                print(f"[{i}/{len(cases)}] {case_id(case)}: {result['total']:.3f}s, "
+                      f"{result['frames']} frames", file=sys.stderr)
+    finally:
+        creating_patterns.collatz_cache = original_store
+        del RENDERERS["timed"]
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+    totals = {name: sum(r["stages"][name] for r in results["cases"].values()) for name in STAGES}
+    print(" ".join(f"{name} {seconds:.2f}s" for name, seconds in totals.items()))
+    print(f"wrote {len(cases)} cases to {args.out}")
+
+
+def _regressed(base, current, threshold, floor=0):
+    return current > base * (1 + threshold) and current - base > floor
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)["cases"]
+    with open(args.current) as f:
+        current = json.load(f)["cases"]
+    shared = sorted(set(baseline) & set(current))
+    regressions = []
+    for case in shared:
+        base, cur = baseline[case], current[case]
+        for name in STAGES:
+            if _regressed(base["stages"][name], cur["stages"][name], args.threshold, MIN_SECONDS):
+                regressions.append((case, name, base["stages"][name], cur["stages"][name], "s"))
+        for metric in ("output_bytes", "peak_memory_bytes"):
+            # Ignore memory changes under 1 MiB.
+            floor = 2**20 if metric == "peak_memory_bytes" else 0
+            if _regressed(base[metric], cur[metric], args.threshold, floor):
+                regressions.append((case, metric, base[metric], cur[metric], "B"))
+    for name in STAGES:
+        base = sum(baseline[case]["stages"][name] for case in shared)
+        cur = sum(current[case]["stages"][name] for case in shared)
+        change = cur / base - 1 if base else 0.0
+        print(f"{name:>10} {base:>9.3f}s -> {cur:>9.3f}s {change:>+7.0%}")
+    missing = sorted(set(baseline) - set(current))
+    if missing:
+        print(f"{len(missing)} baseline cases missing from the current run")
+    if not regressions:
+        print(f"no regressions over {args.threshold:.0%} in {len(shared)} cases")
+        return 0
+    print(f"{len(regressions)} regressions over {args.threshold:.0%}:")
+    for case, name, base, cur, unit in regressions:
+        print(f"  {case} {name}: {base:.4g}{unit} -> {cur:.4g}{unit} ({cur / base - 1:+.0%})")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmark matrix")
+    run_parser.add_argument("--quick", action="store_true", help="smaller matrix: one cap, dpi 50")
+    run_parser.add_argument("--repeat", type=int, default=3,
+                            help="runs per case; the fastest time per stage is kept")
+    run_parser.add_argument("--out", default="bench_stages.json")
+    compare_parser = commands.add_parser("compare", help="flag regressions against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.25,
+                                help="relative slowdown or growth to flag (default 0.25)")
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == '__main__':
+    main()
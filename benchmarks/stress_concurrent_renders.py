@@ -0,0 +1,126 @@
+"""
+Stress check for in-process concurrency: runs N renders at once in threads,
+against a fresh Collatz store that every thread extends concurrently, and
+checks each output byte for byte against the same render run serially.
+Then checks that GIFs rendered in chunks across frame worker processes are
+byte for byte the serial GIF, for both renderers, with adaptive and global
+palettes, and several chunk sizes.
+
+Run from the repository root:
+    python benchmarks/stress_concurrent_renders.py [N]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import creating_patterns
+from collatz_store import CollatzStore
+from creating_patterns import (animation_palette, encode_animation_parallel,
+                               generate_combined_turtle_animation, generate_series,
+                               parse_render_params, render_animation)
+from gif_stream import write_gif
+
+SERIES = ['integers', 'primes', 'fibonacci', 'squares', 'triangular', 'pentagonal']
+CHUNK_SIZES = [8, 13, 50]
+
+
+def render_params(i):
+    form = {
+        'series_type': SERIES[i % len(SERIES)],
+        'cap': str(4 + i % 5),
+        'low_quality': 'on',
+        'renderer': 'matplotlib' if i % 3 else 'raster',
+        'output_format': 'svg' if i % 4 == 3 else 'gif',
+        'symmetry_mirror': ('None', 'Horizontal', 'Vertical')[i % 3],
+        'dark_background': 'on' if i % 2 else '',
+        'random_color_variation': 'on' if i % 5 == 0 else '',
+        'seed': str(i),
+        'max_frames': '60',
+    }
+    return parse_render_params(form)
+
+
+def render_all(jobs, out_dir, threads):
+    def run(item):
+        i, params = item
+        path = os.path.join(out_dir, f"{i}.{params['output_format']}")
+        render_animation(params, path)
+        return path
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(run, enumerate(jobs)))
+
+
+def _gif_bytes(frames, encoded, palette):
+    out = io.BytesIO()
+    write_gif(frames, out, encoded=encoded, palette=palette)
+    return out.getvalue()
+
+
+def chunked_mismatches():
+    """(renderer, palette, chunk size) whose chunked GIF differs from the serial one."""
+    # Long enough that chunks start partway through paths, after limit changes.
+    main_series = generate_series('integers', 10)
+    options = {'left_angle': 30, 'right_angle': 45, 'dpi': 50, 'max_frames': 150,
+               'symmetry_mirror': 'Horizontal', 'random_color_variation': True, 'seed': 3}
+    palettes = {'adaptive': None,
+                'global': animation_palette(len(main_series), random_color_variation=True, seed=3)}
+    mismatched = []
+    for renderer in creating_patterns.RENDERERS:
+        for name, palette in palettes.items():
+            serial = _gif_bytes(generate_combined_turtle_animation(main_series, renderer=renderer,
+                                                                   **options),
+                                encoded=False, palette=palette)
+            for chunk_size in CHUNK_SIZES:
+                chunked = _gif_bytes(encode_animation_parallel(main_series, renderer=renderer, workers=2,
+                                                               palette=palette, chunk_size=chunk_size,
+                                                               **options),
+                                     encoded=True, palette=palette)
+                if chunked != serial:
+                    mismatched.append((renderer, name, chunk_size))
+    return mismatched
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    # Frames are rendered in-thread here, not farmed out to worker processes.
+    creating_patterns.FRAME_WORKERS = 1
+    jobs = [render_params(i) for i in range(n)]
+    with tempfile.TemporaryDirectory() as tmp:
+        creating_patterns.collatz_cache = CollatzStore(os.path.join(tmp, "collatz.log"))
+        os.makedirs(os.path.join(tmp, "parallel"))
+        os.makedirs(os.path.join(tmp, "serial"))
+        start = time.perf_counter()
+        parallel = render_all(jobs, os.path.join(tmp, "parallel"), threads=n)
+        parallel_time = time.perf_counter() - start
+        start = time.perf_counter()
+        serial = render_all(jobs, os.path.join(tmp, "serial"), threads=1)
+        serial_time = time.perf_counter() - start
+
+        mismatched = []
+        for i, (a, b) in enumerate(zip(parallel, serial)):
+            with open(a, 'rb') as fa, open(b, 'rb') as fb:
+                if fa.read() != fb.read():
+                    mismatched.append(i)
+        # The store written by concurrent threads must reload to the same tables.
+        reloaded = CollatzStore(creating_patterns.collatz_cache.path)
+        reloaded.load()
+        store_ok = (reloaded._length == creating_patterns.collatz_cache._length
+                    and reloaded._next == creating_patterns.collatz_cache._next)
+        chunked = chunked_mismatches()
+
+    print(f"{n} renders: {parallel_time:.2f}s in {n} threads, {serial_time:.2f}s serial")
+    print(f"outputs matching serial: {n - len(mismatched)}/{n}; Collatz store consistent: {store_ok}")
+    checked = len(creating_patterns.RENDERERS) * 2 * len(CHUNK_SIZES)
+    print(f"chunked GIFs matching serial: {checked - len(chunked)}/{checked}")
+    if mismatched or not store_ok or chunked:
+        print(f"mismatched renders: {mismatched}; mismatched chunked GIFs: {chunked}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
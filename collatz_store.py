@@ -0,0 +1,263 @@
+import os
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Non-POSIX platforms: fall back to unlocked appends
+    fcntl = None
+
+DENSE_TABLE_LIMIT = 1 << 22  # Largest start kept in the in-memory length table
+DENSE_TABLE_MIN = 1 << 16
+VECTOR_MIN_BATCH = 32  # Below this many misses the per-value walk is cheaper
+_INT64_MAX = np.iinfo(np.int64).max
+_INT64_STEP_LIMIT = (_INT64_MAX - 1) // 3  # Largest odd value whose 3n + 1 fits int64
+
+
+def collatz_step(n):
+    return n // 2 if n % 2 == 0 else 3 * n + 1
+
+
+def _vector_step(cur):
+    odd = (cur & 1).astype(bool)
+    return np.where(odd, 3 * cur + 1, cur >> 1)
+
+
+def _grow_dense_table(table, limit):
+    """
+    Return a copy of the length table extended to cover starts 1..limit.
+    Starts are processed in blocks [lo, hi) whose lanes are stepped together
+    until they drop below lo, where the table already holds the tail length.
+    """
+    grown = np.zeros(limit + 1, dtype=np.int32)
+    grown[:len(table)] = table
+    lo = len(table)
+    while lo <= limit:
+        hi = min(2 * lo, limit + 1)
+        start = np.arange(lo, hi, dtype=np.int64)
+        cur = start.copy()
+        steps = np.zeros(len(start), dtype=np.int32)
+        while len(cur):
+            cur = _vector_step(cur)
+            steps += 1
+            done = cur < lo
+            grown[start[done]] = steps[done] + grown[cur[done]]
+            keep = ~done
+            start, cur, steps = start[keep], cur[keep], steps[keep]
+        lo = hi
+    return grown
+
+
+class CollatzStore:
+    """
+    Persistent Collatz successor tree.
+
+    Every known number is stored once as a line "n next length", where next is
+    the following term of its trajectory and length is the number of terms from
+    n down to 1. Sequences that share a tail share the stored entries, and full
+    sequences are rebuilt on demand by following the next pointers.
+
+    The file is append-only: new entries are appended under an exclusive lock
+    and never rewritten, so several processes can use the same file. A partial
+    last line left by an interrupted writer is never read, and the next writer
+    truncates it away before appending. Entries
+    appended by other processes are picked up before each write and whenever a
+    lookup misses.
+
+    sequences() and lengths() work on whole batches: every missing trajectory
+    is walked in one locked pass, each walk stopping at the first value already
+    known (including values found earlier in the same batch), and the new
+    entries are appended in a single write. lengths() answers large batches of
+    int64 starts with a vectorized NumPy walk over a shared dense length table.
+
+    A store is safe to share between threads: entries are only ever added,
+    lookups read them without locking, and every change to the in-memory
+    tables and the file position happens under one lock (the file lock alone
+    does not order threads of the same process that share a descriptor).
+
+    hits and misses count the values looked up that were already known
+    (stored, or covered by the dense length table) and that had to be
+    computed. The file is only read on the first lookup (or an explicit
+    load()), so creating a store costs nothing however large it is.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._next = {}
+        self._length = {1: 1}
+        self._dense = np.array([0, 1], dtype=np.int32)
+        self._offset = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._loaded = False
+
+    def load(self):
+        """Read the entries stored so far, if that has not happened yet."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._refresh()
+                    self._loaded = True
+
+    def __contains__(self, n):
+        self.load()
+        return n in self._length
+
+    def __len__(self):
+        self.load()
+        return len(self._length)
+
+    def length(self, n):
+        return self.lengths([n])[0]
+
+    def sequence(self, n):
+        return self.sequences([n])[0]
+
+    def sequences(self, values):
+        """Full trajectories for every value (values below 1 start at 1)."""
+        self.load()
+        starts = [max(v, 1) for v in values]
+        missing = [v for v in starts if v not in self._length]
+        self._count(len(starts), len(missing))
+        if missing:
+            self._extend_many(missing)
+        return [self._rebuild(v) for v in starts]
+
+    def lengths(self, values):
+        """Trajectory lengths for every value, without rebuilding sequences."""
+        self.load()
+        starts = [max(v, 1) for v in values]
+        result = [self._length.get(v) for v in starts]
+        missing = [i for i, length in enumerate(result) if length is None]
+        computed = len(missing)
+        vector = [i for i in missing if starts[i] <= _INT64_MAX]
+        if len(vector) >= VECTOR_MIN_BATCH:
+            # Starts the dense table already covers are read from it, not computed.
+            covered = len(self._dense)
+            computed -= sum(1 for i in vector if starts[i] < covered)
+            found = self._vector_lengths(np.array([starts[i] for i in vector], dtype=np.int64))
+            for i, length in zip(vector, found.tolist()):
+                result[i] = length
+            missing = [i for i in missing if result[i] is None]
+        self._count(len(starts), computed)
+        if missing:
+            self._extend_many(starts[i] for i in missing)
+            for i in missing:
+                result[i] = self._length[starts[i]]
+        return result
+
+    def _count(self, looked_up, missing):
+        with self._lock:
+            self.hits += looked_up - missing
+            self.misses += missing
+
+    def _rebuild(self, n):
+        seq = [n]
+        while n != 1:
+            n = self._next[n]
+            seq.append(n)
+        return seq
+
+    def _vector_lengths(self, values):
+        # Only dense ranges grow the table; sparse large starts walk down into it.
+        small = values[values <= DENSE_TABLE_LIMIT]
+        limit = max(int(small.max()) if len(small) else 0, DENSE_TABLE_MIN)
+        if limit >= len(self._dense):
+            with self._lock:
+                if limit >= len(self._dense):
+                    self._dense = _grow_dense_table(self._dense, limit)
+        table = self._dense
+        result = np.empty(len(values), dtype=np.int64)
+        lane = np.arange(len(values))
+        cur = values.copy()
+        steps = np.zeros(len(values), dtype=np.int64)
+        while len(cur):
+            done = cur < len(table)
+            result[lane[done]] = steps[done] + table[cur[done]]
+            # Lanes about to overflow int64 finish on the arbitrary-precision walk.
+            overflow = ~done & (cur & 1).astype(bool) & (cur > _INT64_STEP_LIMIT)
+            for i in np.flatnonzero(overflow):
+                result[lane[i]] = steps[i] + self.length(int(cur[i]))
+            keep = ~(done | overflow)
+            lane, cur, steps = lane[keep], _vector_step(cur[keep]), steps[keep] + 1
+        return result
+
+    def _refresh(self):
+        """Load entries appended to the file since the last refresh."""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        end = data.rfind(b"\n") + 1
+        if not end:
+            return
+        self._offset += end
+        self._load_lines(data[:end])
+
+    def _load_lines(self, data):
+        lines = data.splitlines()
+        fields = data.split()
+        if len(fields) == 3 * len(lines):
+            # Every line has three fields, so convert them all in one pass. Only
+            # complete lines get here: a torn tail is truncated, never extended.
+            try:
+                numbers = list(map(int, fields))
+            except ValueError:
+                pass
+            else:
+                starts = numbers[0::3]
+                self._next.update(zip(starts, numbers[1::3]))
+                self._length.update(zip(starts, numbers[2::3]))
+                return
+        for line in lines:
+            parts = line.split()
+            if len(parts) != 3:
+                continue  # Torn write left behind by a crashed process
+            try:
+                n, nxt, length = (int(p) for p in parts)
+            except ValueError:
+                continue
+            self._next[n] = nxt
+            self._length[n] = length
+
+    def _walk(self, n, lines):
+        # Walk until a known value, then link the new entries to its tail.
+        path = []
+        while n not in self._length:
+            nxt = collatz_step(n)
+            path.append((n, nxt))
+            n = nxt
+        length = self._length[n]
+        for value, nxt in reversed(path):
+            length += 1
+            self._next[value] = nxt
+            self._length[value] = length
+            lines.append(f"{value} {nxt} {length}\n")
+
+    def _extend_many(self, values):
+        with self._lock, open(self.path, "ab+") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                lines = []
+                for n in values:
+                    self._walk(n, lines)
+                if not lines:
+                    return
+                data = "".join(lines).encode("ascii")
+                f.seek(0, os.SEEK_END)
+                if f.tell() != self._offset:
+                    # Drop a partial line left by an interrupted writer; completing
+                    # it could turn a cut-off length into a valid-looking entry.
+                    f.truncate(self._offset)
+                f.write(data)
+                f.flush()
+                self._offset += len(data)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
@@ -1,46 +1,60 @@
+import gc
+import io
+import itertools
+import math
 import os
-import json
 import random
-import math
-import io
-import base64
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
-import imageio.v2 as imageio  # Use v2 to avoid deprecation warnings
+import threading
+import time
+from collections import deque
+import numpy as np
+# matplotlib, cProfile and the process pool are imported where they are first
+# used, so the web process and its workers start without paying for them
+# (matplotlib alone is about half a second); see warm_up().
+
+from flask import Flask, request, render_template_string, jsonify, send_file, url_for, g, Response
 
-from flask import Flask, request, render_template_string, jsonify
+from collatz_store import CollatzStore
+from gif_stream import DeltaEncoder, encode_frame, ramp_levels, ramp_palette, write_gif
+from metrics import COUNT_BUCKETS, SIZE_BUCKETS, Registry
+from render_cache import RenderCache, params_key
+from render_jobs import QueueFull, RenderJobQueue
+from raster_renderer import FIGURE_INCHES, RasterCanvas
+from svg_animation import write_svg_animation
 
 app = Flask(__name__)
 
 # --- Collatz Cache Setup ---
-CACHE_FILENAME = "collatz_cache.json"
-if os.path.exists(CACHE_FILENAME):
-    with open(CACHE_FILENAME, "r") as f:
-        collatz_cache = json.load(f)
-else:
-    collatz_cache = {}
+# Successor-tree store: one "n next length" line per number, appended on miss.
+CACHE_FILENAME = "collatz_cache.log"
+collatz_cache = CollatzStore(CACHE_FILENAME)
 
 def get_cached_collatz(n):
-    key = str(n)
-    if key in collatz_cache:
-        return collatz_cache[key]
-    seq = collatz(n)
-    collatz_cache[key] = seq
-    with open(CACHE_FILENAME, "w") as f:
-        json.dump(collatz_cache, f)
-    return seq
+    return collatz_cache.sequence(n)
 
 # --- Series Generation Functions ---
-def fibonacci(n):
-    if n <= 0:
-        return []
-    elif n == 1:
-        return [0]
-    series = [0, 1]
-    while len(series) < n:
-        series.append(series[-1] + series[-2])
-    return series
+# Each series is an extender: extend(terms, n) appends to the memoized prefix
+# `terms` until it holds at least n terms. generate_series only calls it when
+# a larger cap than ever before is requested.
+SERIES_REGISTRY = {}
+_series_memo = {}
+_series_lock = threading.Lock()
+
+def register_series(name):
+    def decorator(extend):
+        SERIES_REGISTRY[name] = extend
+        _series_memo[name] = []
+        return extend
+    return decorator
+
+@register_series("fibonacci")
+def extend_fibonacci(terms, n):
+    if not terms:
+        terms.append(0)
+    if len(terms) == 1 and n > 1:
+        terms.append(1)
+    while len(terms) < n:
+        terms.append(terms[-1] + terms[-2])
 
 def collatz(start):
     if start < 1:
@@ -54,81 +68,412 @@ def collatz(start):
         sequence.append(start)
     return sequence
 
-def is_prime(num):
-    if num < 2:
-        return False
-    for i in range(2, int(num**0.5) + 1):
-        if num % i == 0:
-            return False
-    return True
+PRIME_SEGMENT_SIZE = 1 << 20
 
-def primes(n):
-    if n <= 0:
-        return []
-    prime_list = []
-    candidate = 2
-    while len(prime_list) < n:
-        if is_prime(candidate):
-            prime_list.append(candidate)
-        candidate += 1
-    return prime_list
-
-def triangular_numbers(n):
-    return [i * (i + 1) // 2 for i in range(1, n + 1)]
-
-def squares(n):
-    return [i ** 2 for i in range(1, n + 1)]
-
-def cubes(n):
-    return [i ** 3 for i in range(1, n + 1)]
-
-def factorials(n):
-    result = []
-    fact = 1
-    for i in range(1, n + 1):
+def nth_prime_upper_bound(n):
+    # Rosser's bound p_n < n (ln n + ln ln n), valid for n >= 6.
+    if n < 6:
+        return 15
+    return int(n * (math.log(n) + math.log(math.log(n)))) + 1
+
+def _small_primes(limit):
+    sieve = bytearray([1]) * (limit + 1)
+    sieve[:2] = b"\0\0"
+    for p in range(2, math.isqrt(limit) + 1):
+        if sieve[p]:
+            sieve[p * p::p] = bytes(len(range(p * p, limit + 1, p)))
+    return list(itertools.compress(range(limit + 1), sieve))
+
+def _sieve_segment(lo, hi):
+    # Primes in [lo, hi), crossing off multiples of the base primes up to sqrt(hi).
+    segment = bytearray([1]) * (hi - lo)
+    for p in _small_primes(math.isqrt(hi - 1)):
+        first = max(p * p, -(-lo // p) * p)
+        segment[first - lo::p] = bytes(len(range(first - lo, hi - lo, p)))
+    return list(itertools.compress(range(lo, hi), segment))
+
+@register_series("primes")
+def extend_primes(terms, n):
+    # Sieve onward from the last known prime, up to the bound for the n-th prime.
+    lo = terms[-1] + 1 if terms else 2
+    bound = nth_prime_upper_bound(n)
+    while len(terms) < n:
+        hi = min(max(bound, lo + 1), lo + PRIME_SEGMENT_SIZE)
+        terms.extend(_sieve_segment(lo, hi))
+        lo = hi
+
+@register_series("triangular")
+def extend_triangular(terms, n):
+    terms.extend(i * (i + 1) // 2 for i in range(len(terms) + 1, n + 1))
+
+@register_series("squares")
+def extend_squares(terms, n):
+    terms.extend(i ** 2 for i in range(len(terms) + 1, n + 1))
+
+@register_series("cubes")
+def extend_cubes(terms, n):
+    terms.extend(i ** 3 for i in range(len(terms) + 1, n + 1))
+
+@register_series("factorials")
+def extend_factorials(terms, n):
+    fact = terms[-1] if terms else 1
+    for i in range(len(terms) + 1, n + 1):
         fact *= i
-        result.append(fact)
-    return result
+        terms.append(fact)
 
-def powers_of_two(n):
-    return [2 ** i for i in range(n)]
+@register_series("powers_of_two")
+def extend_powers_of_two(terms, n):
+    terms.extend(2 ** i for i in range(len(terms), n))
 
-def pentagonal_numbers(n):
-    return [(3 * i ** 2 - i) // 2 for i in range(1, n + 1)]
+@register_series("pentagonal")
+def extend_pentagonal(terms, n):
+    terms.extend((3 * i ** 2 - i) // 2 for i in range(len(terms) + 1, n + 1))
 
-def integers(n):
-    return list(range(1, n+1))
+@register_series("integers")
+def extend_integers(terms, n):
+    terms.extend(range(len(terms) + 1, n + 1))
 
 def generate_series(series_type, n):
     series_type = series_type.lower()
-    if series_type == "fibonacci":
-        return fibonacci(n)
-    elif series_type == "primes":
-        return primes(n)
-    elif series_type == "triangular":
-        return triangular_numbers(n)
-    elif series_type == "squares":
-        return squares(n)
-    elif series_type == "cubes":
-        return cubes(n)
-    elif series_type == "factorials":
-        return factorials(n)
-    elif series_type == "powers_of_two":
-        return powers_of_two(n)
-    elif series_type == "pentagonal":
-        return pentagonal_numbers(n)
-    elif series_type == "integers":
-        return integers(n)
-    else:
+    if series_type not in SERIES_REGISTRY:
         raise ValueError("Unknown series type.")
+    if n <= 0:
+        return []
+    with _series_lock:
+        terms = _series_memo[series_type]
+        if len(terms) < n:
+            SERIES_REGISTRY[series_type](terms, n)
+        return terms[:n]
+
+# --- Turtle Geometry ---
+def _parity_mod_turns(seq, odd, left_mod, right_mod):
+    if left_mod == 0 or right_mod == 0:
+        raise ZeroDivisionError("float modulo")
+    try:
+        values = np.array(seq, dtype=np.int64)
+    except OverflowError:
+        # Arbitrary-precision terms (e.g. factorials) keep Python's int % float semantics.
+        return np.array([(step % left_mod) if step % 2 != 0 else (step % right_mod) for step in seq],
+                        dtype=float)
+    return np.where(odd, np.mod(values, left_mod), np.mod(values, right_mod))
+
+def turtle_geometry(seq, left_angle, right_angle, step_length=10, custom_transform=False,
+                    left_mod=180, right_mod=180, consecutive_increment=False,
+                    variable_step=False, rotation_drift=0.0):
+    """
+    Compute the turtle path for one Collatz sequence.
+    Odd terms turn left, even terms turn right; the heading is a cumulative sum
+    of the signed turns plus rotation_drift.
+    Returns (x, y, step_lengths): x and y hold len(seq) + 1 points starting at
+    the origin, step_lengths[i] is the length of the i-th step.
+    """
+    n = len(seq)
+    odd = np.fromiter((step % 2 != 0 for step in seq), dtype=bool, count=n)
+    index = np.arange(n)
+    if custom_transform:
+        turns = _parity_mod_turns(seq, odd, left_mod, right_mod)
+    else:
+        turns = np.where(odd, float(left_angle), float(right_angle))
+        if consecutive_increment:
+            # Position of each term within its run of same-parity terms.
+            run_start = np.ones(n, dtype=bool)
+            run_start[1:] = odd[1:] != odd[:-1]
+            turns = turns + (index - np.maximum.accumulate(np.where(run_start, index, 0)))
+    if variable_step:
+        step_lengths = step_length * (1 + 0.05 * index)
+    else:
+        step_lengths = np.full(n, float(step_length))
+    rad = np.radians(np.cumsum(np.where(odd, turns, -turns) + rotation_drift))
+    x = np.zeros(n + 1)
+    y = np.zeros(n + 1)
+    np.cumsum(step_lengths * np.cos(rad), out=x[1:])
+    np.cumsum(step_lengths * np.sin(rad), out=y[1:])
+    return x, y, step_lengths
+
+def mirror_coords(x, y, symmetry_mirror):
+    if symmetry_mirror == "Horizontal":
+        return -x, y
+    if symmetry_mirror == "Vertical":
+        return x, -y
+    return None
+
+# --- Frame Budget ---
+FRAME_BUDGETS = ("even", "short")
+
+def _spread_steps(n_steps, n_frames):
+    # n_frames step indices spread evenly over 0..n_steps-1, always ending on the last.
+    return (np.arange(1, n_frames + 1) * n_steps + n_frames - 1) // n_frames - 1
+
+def budget_frames(lengths, max_frames=None, target_duration=None, frame_budget="even"):
+    """
+    Choose which steps of each sequence get a frame, given the sequence lengths
+    (steps per sequence), so the animation has at most max_frames frames and
+    lasts at most target_duration seconds. Every sequence keeps at least its
+    last step, so the final picture is exact. "even" draws the same number of
+    steps per frame everywhere; "short" keeps every step of short sequences
+    and thins the longest ones first.
+    Returns one array of step indices per sequence.
+    """
+    if frame_budget not in FRAME_BUDGETS:
+        raise ValueError("Unknown frame budget.")
+    lengths = np.asarray(lengths, dtype=np.int64)
+    budget = lengths.sum()
+    if max_frames is not None:
+        budget = min(budget, max_frames)
+    if target_duration is not None:
+        budget = min(budget, int((target_duration - HOLD_DURATION * len(lengths)) / FRAME_DURATION))
+    budget = max(budget, len(lengths))
+    if budget >= lengths.sum():
+        counts = lengths
+    elif frame_budget == "short":
+        # Largest per-sequence frame count that fits the budget.
+        lo, hi = 1, int(lengths.max())
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if np.minimum(lengths, mid).sum() <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        counts = np.minimum(lengths, lo)
+    else:
+        # Smallest number of steps per frame that fits the budget.
+        lo, hi = 1, int(lengths.max())
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if (-(-lengths // mid)).sum() <= budget:
+                hi = mid
+            else:
+                lo = mid + 1
+        counts = -(-lengths // lo)
+    return [_spread_steps(n, f) for n, f in zip(lengths.tolist(), counts.tolist())]
+
+def compute_animation_geometry(main_series, left_angle, right_angle, step_length=10,
+                               custom_transform=False, left_mod=180, right_mod=180,
+                               consecutive_increment=False, variable_step=False,
+                               rotation_drift=0.0, symmetry_mirror="None",
+                               max_frames=None, target_duration=None, frame_budget="even"):
+    """
+    Precompute every path of the animation before rendering.
+    Each path is a dict with 'x', 'y', 'steps', 'mirror' ((x, y) or None) and
+    'limits', an (n_steps, 4) array of (xmin, xmax, ymin, ymax) axis limits for
+    the frame drawn after each step: the bounds of all finished paths and the
+    current prefix, padded by twice the current step length. 'frames' holds the
+    steps that get a frame, chosen by budget_frames (every step by default).
+    """
+    paths = []
+    xmin = ymin = np.inf
+    xmax = ymax = -np.inf
+    # All trajectories are fetched in one batch so overlapping tails are walked once.
+    for seq in collatz_cache.sequences(main_series):
+        x, y, steps = turtle_geometry(seq, left_angle, right_angle, step_length=step_length,
+                                      custom_transform=custom_transform, left_mod=left_mod,
+                                      right_mod=right_mod, consecutive_increment=consecutive_increment,
+                                      variable_step=variable_step, rotation_drift=rotation_drift)
+        margin = steps * 2
+        path_xmin = np.minimum(np.minimum.accumulate(x), xmin)[1:]
+        path_xmax = np.maximum(np.maximum.accumulate(x), xmax)[1:]
+        path_ymin = np.minimum(np.minimum.accumulate(y), ymin)[1:]
+        path_ymax = np.maximum(np.maximum.accumulate(y), ymax)[1:]
+        limits = np.column_stack((path_xmin - margin, path_xmax + margin,
+                                  path_ymin - margin, path_ymax + margin))
+        xmin, xmax, ymin, ymax = path_xmin[-1], path_xmax[-1], path_ymin[-1], path_ymax[-1]
+        paths.append({'x': x, 'y': y, 'steps': steps, 'limits': limits,
+                      'mirror': mirror_coords(x, y, symmetry_mirror)})
+    plan = budget_frames([len(path['limits']) for path in paths], max_frames, target_duration,
+                         frame_budget)
+    for path, frames in zip(paths, plan):
+        path['frames'] = frames
+    return paths
 
 # --- Cumulative Turtle Animation Function ---
+FRAME_DURATION = 0.1  # Seconds per Collatz step
+HOLD_DURATION = 0.5  # Extra seconds a finished sequence stays on screen
+CURRENT_LINE_ALPHA = 0.9
+FINISHED_LINE_WIDTH = 2
+FINISHED_LINE_ALPHA = 0.6
+
+def capture_frame(fig):
+    """
+    Draw the figure and return its Agg RGBA buffer as an (h, w, 4) uint8 array.
+    The array is a view of the canvas buffer and is overwritten by the next draw.
+    """
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba())
+
+def path_colors(n_paths, cmap_name="viridis", random_color_variation=False, seed=None):
+    """One color per path: evenly spaced colormap samples, or seeded random RGB."""
+    if random_color_variation:
+        rng = random.Random(seed)
+        return [(rng.random(), rng.random(), rng.random()) for _ in range(n_paths)]
+    import matplotlib
+    cmap = matplotlib.colormaps.get_cmap(cmap_name)
+    return [cmap(idx / max(n_paths-1, 1)) for idx in range(n_paths)]
+
+def background_color(dark_background):
+    return "#222222" if dark_background else "#f0f8ff"
+
+def animation_palette(n_paths, cmap_name="viridis", dark_background=False,
+                      random_color_variation=False, seed=None):
+    """
+    Global GIF palette for an animation: its background and line colors, at
+    the current and finished line alphas (see ramp_palette). None when there
+    are too many lines to share one palette well.
+    """
+    from matplotlib.colors import to_rgb
+    colors = path_colors(n_paths, cmap_name, random_color_variation, seed)
+    to_bytes = lambda color: tuple(round(255 * c) for c in to_rgb(color))
+    return ramp_palette(to_bytes(background_color(dark_background)),
+                        [to_bytes(color) for color in colors], max_alpha=CURRENT_LINE_ALPHA,
+                        alphas=(FINISHED_LINE_ALPHA,))
+
+def uses_global_palette(n_paths):
+    """Whether a GIF of n_paths sequences is delta-encoded against animation_palette."""
+    return GIF_GLOBAL_PALETTE and bool(ramp_levels(n_paths, n_alphas=1))
+
+def frame_durations(path):
+    """Display time of each of a path's frames; the last one carries the hold."""
+    durations = np.full(len(path['frames']), FRAME_DURATION)
+    durations[-1] += HOLD_DURATION
+    return durations
+
+def _locate_frame(paths, frame):
+    # Map a global frame number to (path index, frame index within the path).
+    for idx, path in enumerate(paths):
+        if frame < len(path['frames']):
+            return idx, frame
+        frame -= len(path['frames'])
+    return len(paths), 0
+
+class MatplotlibCanvas:
+    """
+    Turtle frame renderer backed by a matplotlib figure.
+    Lines are persistent Line2D artists: updates only change their data or
+    style, and capture() draws the figure and returns the Agg buffer. The
+    figure is not registered with pyplot, so canvases are independent and
+    can render concurrently in separate threads.
+    """
+
+    incremental = False  # Every capture draws the whole figure
+
+    def __init__(self, dpi, bg_color):
+        # Figures get their own Agg canvas instead of going through pyplot's global
+        # figure manager, so several renders can run in one process at once.
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        self.fig = Figure(figsize=(FIGURE_INCHES, FIGURE_INCHES), dpi=dpi)
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        # The axes patch is hidden with the axis, so the figure carries the background.
+        self.fig.set_facecolor(bg_color)
+        self.ax.set_facecolor(bg_color)
+        self.ax.axis('off')
+
+    def add_line(self, x, y, color, linewidth, alpha):
+        line, = self.ax.plot(x, y, color=color, lw=linewidth, alpha=alpha)
+        return line
+
+    def set_line_data(self, line, x, y):
+        line.set_data(x, y)
+
+    def set_line_style(self, line, linewidth, alpha):
+        line.set_linewidth(linewidth)
+        line.set_alpha(alpha)
+
+    def remove_line(self, line):
+        line.remove()
+
+    def set_limits(self, xmin, xmax, ymin, ymax):
+        self.ax.set_xlim(xmin, xmax)
+        self.ax.set_ylim(ymin, ymax)
+
+    def capture(self):
+        return capture_frame(self.fig)
+
+    def close(self):
+        self.fig.clear()
+
+# Frame renderers share the canvas interface above; "raster" skips matplotlib's
+# axes machinery and draws straight into a NumPy buffer.
+RENDERERS = {
+    "matplotlib": MatplotlibCanvas,
+    "raster": RasterCanvas,
+}
+
+def render_frames(paths, colors, stroke_width=3, dpi=100, dark_background=False,
+                  start=0, stop=None, renderer="matplotlib"):
+    """
+    Render frames start..stop (one per planned step, numbered across all paths) from
+    precomputed geometry and colors with the named backend from RENDERERS.
+    The canvas state for `start` is rebuilt directly, so any range can be
+    rendered on its own and matches the same frames of a full render. An
+    incremental canvas also replays, without yielding them, the frames since
+    it last redrew the current path whole.
+    Yields (frame, duration) pairs like generate_combined_turtle_animation.
+    """
+    if renderer not in RENDERERS:
+        raise ValueError("Unknown renderer.")
+    bg_color = background_color(dark_background)
+    canvas = RENDERERS[renderer](dpi, bg_color)
+    first_path, first_frame = _locate_frame(paths, start)
+    replay_from = first_frame
+    if canvas.incremental and first_path < len(paths):
+        # The canvas redraws its lines whole when the axis limits change.
+        path = paths[first_path]
+        steps = path['frames']
+        while replay_from > 0 and np.array_equal(path['limits'][steps[replay_from]],
+                                                 path['limits'][steps[replay_from - 1]]):
+            replay_from -= 1
+    for path, color in zip(paths[:first_path], colors):
+        canvas.add_line(path['x'], path['y'], color, FINISHED_LINE_WIDTH, FINISHED_LINE_ALPHA)
+    remaining = -1 if stop is None else stop - start
+    # Lines persist across frames: each step only extends the current line's
+    # data, and a finished line is restyled in place instead of re-drawn.
+    current_line = None
+    mirror_line = None
+    
+    try:
+        for idx in range(first_path, len(paths)):
+            path = paths[idx]
+            current_color = colors[idx]
+            if current_line is not None:
+                canvas.set_line_style(current_line, FINISHED_LINE_WIDTH, FINISHED_LINE_ALPHA)
+            if mirror_line is not None:
+                canvas.remove_line(mirror_line)
+                mirror_line = None
+            current_line = canvas.add_line([], [], current_color, stroke_width, CURRENT_LINE_ALPHA)
+            if path['mirror'] is not None:
+                mirror_line = canvas.add_line([], [], current_color, stroke_width, CURRENT_LINE_ALPHA)
+            
+            frame_from = replay_from if idx == first_path else 0
+            for k, i in enumerate(path['frames'][frame_from:], frame_from):
+                replay = idx == first_path and k < first_frame
+                if remaining == 0:
+                    return
+                end = i + 2
+                canvas.set_line_data(current_line, path['x'][:end], path['y'][:end])
+                if mirror_line is not None:
+                    canvas.set_line_data(mirror_line, path['mirror'][0][:end], path['mirror'][1][:end])
+                canvas.set_limits(*path['limits'][i])
+                if replay:
+                    canvas.capture()
+                    continue
+                remaining -= 1
+                duration = FRAME_DURATION
+                if end == len(path['x']):
+                    # Hold the finished sequence on screen by extending its last frame.
+                    duration += HOLD_DURATION
+                yield canvas.capture(), duration
+    finally:
+        canvas.close()
+
 def generate_combined_turtle_animation(main_series, left_angle, right_angle, step_length=10, 
                                          stroke_width=3, dpi=100, custom_transform=False, 
                                          left_mod=180, right_mod=180, cmap_name="viridis", 
                                          dark_background=False, consecutive_increment=False,
                                          variable_step=False, rotation_drift=0.0,
-                                         symmetry_mirror="None", random_color_variation=False):
+                                         symmetry_mirror="None", random_color_variation=False,
+                                         seed=None, renderer="matplotlib", max_frames=None,
+                                         target_duration=None, frame_budget="even"):
     """
     For each number in main_series, use the cached Collatz sequence and simulate a turtle drawing.
     Options:
@@ -138,90 +483,128 @@ def generate_combined_turtle_animation(main_series, left_angle, right_angle, ste
       - rotation_drift: constant drift added each step.
       - symmetry_mirror: "None", "Horizontal", or "Vertical" mirror of the drawing.
       - random_color_variation: random color per sequence.
+      - seed: seed for the random colors, making the output reproducible.
       - dark_background: use dark background.
+      - renderer: frame backend, "matplotlib" or "raster" (see RENDERERS).
+      - max_frames, target_duration, frame_budget: draw several steps per frame to
+        stay within a frame count or duration (see budget_frames).
     Output figure size is 12x12 inches.
-    Returns a list of frames for the GIF.
+    Yields (frame, duration) pairs: an RGBA frame and its display time in seconds.
+    The last frame of every sequence carries the hold. Each frame is a view of the
+    canvas buffer, only valid until the next frame is requested, so consumers must
+    encode or copy it before advancing.
     """
-    frames = []
-    completed_paths = []
-    cmap = plt.get_cmap(cmap_name)
-    fig, ax = plt.subplots(figsize=(15, 15), dpi=dpi)
-    bg_color = "#222222" if dark_background else "#f0f8ff"
-    ax.set_facecolor(bg_color)
-    
-    for idx, num in enumerate(main_series):
-        collatz_start = num if num >= 1 else 1
-        seq = get_cached_collatz(collatz_start)
-        x_coords = [0]
-        y_coords = [0]
-        angle = 0
-        if random_color_variation:
-            current_color = (random.random(), random.random(), random.random())
-        else:
-            current_color = cmap(idx / max(len(main_series)-1, 1))
-        consecutive_odd = 0
-        consecutive_even = 0
-        
-        for i, step in enumerate(seq):
-            if custom_transform:
-                effective_turn = (step % left_mod) if (step % 2 != 0) else (step % right_mod)
-            else:
-                if consecutive_increment:
-                    if step % 2 != 0:
-                        consecutive_odd += 1
-                        consecutive_even = 0
-                        effective_turn = left_angle + (consecutive_odd - 1)
-                    else:
-                        consecutive_even += 1
-                        consecutive_odd = 0
-                        effective_turn = right_angle + (consecutive_even - 1)
-                else:
-                    effective_turn = left_angle if (step % 2 != 0) else right_angle
-            current_step_length = step_length * (1 + 0.05 * i) if variable_step else step_length
-            if step % 2 != 0:
-                angle += effective_turn
-            else:
-                angle -= effective_turn
-            angle += rotation_drift
-            rad = math.radians(angle)
-            new_x = x_coords[-1] + current_step_length * math.cos(rad)
-            new_y = y_coords[-1] + current_step_length * math.sin(rad)
-            x_coords.append(new_x)
-            y_coords.append(new_y)
-            
-            ax.clear()
-            ax.set_facecolor(bg_color)
-            ax.axis('off')
-            for path in completed_paths:
-                ax.plot(path['x'], path['y'], color=path['color'], lw=2, alpha=0.6)
-            ax.plot(x_coords, y_coords, color=current_color, lw=stroke_width, alpha=0.9)
-            if symmetry_mirror == "Horizontal":
-                mirrored_x = [-x for x in x_coords]
-                ax.plot(mirrored_x, y_coords, color=current_color, lw=stroke_width, alpha=0.9)
-            elif symmetry_mirror == "Vertical":
-                mirrored_y = [-y for y in y_coords]
-                ax.plot(x_coords, mirrored_y, color=current_color, lw=stroke_width, alpha=0.9)
-            margin = current_step_length * 2
-            all_x = [pt for path in completed_paths for pt in path['x']] + x_coords
-            all_y = [pt for path in completed_paths for pt in path['y']] + y_coords
-            if all_x and all_y:
-                ax.set_xlim(min(all_x)-margin, max(all_x)+margin)
-                ax.set_ylim(min(all_y)-margin, max(all_y)+margin)
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png')
-            buf.seek(0)
-            frame = imageio.imread(buf)
-            frames.append(frame)
-        
-        completed_paths.append({'x': x_coords, 'y': y_coords, 'color': current_color})
-        for _ in range(5):
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png')
-            buf.seek(0)
-            frame = imageio.imread(buf)
-            frames.append(frame)
-    plt.close(fig)
-    return frames
+    paths = compute_animation_geometry(main_series, left_angle, right_angle, step_length=step_length,
+                                       custom_transform=custom_transform, left_mod=left_mod,
+                                       right_mod=right_mod, consecutive_increment=consecutive_increment,
+                                       variable_step=variable_step, rotation_drift=rotation_drift,
+                                       symmetry_mirror=symmetry_mirror, max_frames=max_frames,
+                                       target_duration=target_duration, frame_budget=frame_budget)
+    colors = path_colors(len(paths), cmap_name, random_color_variation, seed)
+    yield from render_frames(paths, colors, stroke_width=stroke_width, dpi=dpi,
+                             dark_background=dark_background, renderer=renderer)
+
+# --- Animated SVG Output ---
+def write_turtle_svg(main_series, fileobj, left_angle, right_angle, step_length=10,
+                     stroke_width=3, dpi=100, custom_transform=False,
+                     left_mod=180, right_mod=180, cmap_name="viridis",
+                     dark_background=False, consecutive_increment=False,
+                     variable_step=False, rotation_drift=0.0,
+                     symmetry_mirror="None", random_color_variation=False, seed=None,
+                     max_frames=None, target_duration=None, frame_budget="even"):
+    """
+    Write the same animation as generate_combined_turtle_animation to fileobj
+    (opened in text mode) as a single animated SVG: each path is one polyline
+    revealed on the GIF's timing, so nothing is rasterized per frame.
+    """
+    paths = compute_animation_geometry(main_series, left_angle, right_angle, step_length=step_length,
+                                       custom_transform=custom_transform, left_mod=left_mod,
+                                       right_mod=right_mod, consecutive_increment=consecutive_increment,
+                                       variable_step=variable_step, rotation_drift=rotation_drift,
+                                       symmetry_mirror=symmetry_mirror, max_frames=max_frames,
+                                       target_duration=target_duration, frame_budget=frame_budget)
+    colors = path_colors(len(paths), cmap_name, random_color_variation, seed)
+    bg_color = background_color(dark_background)
+    write_svg_animation(fileobj, paths, colors, [frame_durations(path) for path in paths],
+                        bg_color, dpi, current_style=(stroke_width, CURRENT_LINE_ALPHA),
+                        finished_style=(FINISHED_LINE_WIDTH, FINISHED_LINE_ALPHA))
+
+# --- Parallel Frame Rendering ---
+MIN_FRAME_CHUNK = 8  # Each chunk rebuilds its starting figure state once
+_frame_worker_state = {}
+
+def _frame_pool_context():
+    # Forking skips pickling the geometry, but only a single-threaded caller
+    # can fork safely: another thread may hold a lock the child would inherit.
+    import multiprocessing
+    methods = multiprocessing.get_all_start_methods()
+    if "fork" in methods and threading.active_count() == 1:
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _init_frame_worker(paths, colors, render_options, palette):
+    # Geometry is sent once per worker process rather than with every chunk.
+    _frame_worker_state.update(paths=paths, colors=colors, options=render_options,
+                               palette=palette)
+
+def _encode_frame_range(start, stop):
+    state = _frame_worker_state
+    if state['palette'] is None:
+        frames = render_frames(state['paths'], state['colors'], start=start, stop=stop,
+                               **state['options'])
+        return [encode_frame(frame, duration) for frame, duration in frames]
+    # The frame before the chunk is rendered and encoded only to prime the
+    # encoder, so the chunk's first delta is the one the serial stream has.
+    primed = max(start - 1, 0)
+    frames = render_frames(state['paths'], state['colors'], start=primed, stop=stop,
+                           **state['options'])
+    encoder = DeltaEncoder(state['palette'])
+    return [encoder.encode(frame, duration) for frame, duration in frames][start - primed:]
+
+def encode_animation_parallel(main_series, left_angle, right_angle, step_length=10,
+                              stroke_width=3, dpi=100, custom_transform=False,
+                              left_mod=180, right_mod=180, cmap_name="viridis",
+                              dark_background=False, consecutive_increment=False,
+                              variable_step=False, rotation_drift=0.0,
+                              symmetry_mirror="None", random_color_variation=False,
+                              seed=None, renderer="matplotlib", max_frames=None,
+                              target_duration=None, frame_budget="even", palette=None,
+                              workers=2, chunk_size=None):
+    """
+    Render and encode the same animation as generate_combined_turtle_animation
+    across `workers` processes. Geometry and colors are computed once here; each
+    worker owns its own figure and renders contiguous chunks of frames, and
+    returns them already GIF-encoded, which is far less data to send back than
+    raw RGBA. Yields (data, size) pairs in frame order for write_gif(encoded=True).
+    The output is byte-identical to the serial path, with or without a palette
+    (pass the same palette to write_gif): each chunk after the first renders
+    one extra frame to take its first delta against.
+    chunk_size defaults to about four chunks per worker, at least MIN_FRAME_CHUNK.
+    """
+    paths = compute_animation_geometry(main_series, left_angle, right_angle, step_length=step_length,
+                                       custom_transform=custom_transform, left_mod=left_mod,
+                                       right_mod=right_mod, consecutive_increment=consecutive_increment,
+                                       variable_step=variable_step, rotation_drift=rotation_drift,
+                                       symmetry_mirror=symmetry_mirror, max_frames=max_frames,
+                                       target_duration=target_duration, frame_budget=frame_budget)
+    colors = path_colors(len(paths), cmap_name, random_color_variation, seed)
+    total = sum(len(path['frames']) for path in paths)
+    if chunk_size is None:
+        chunk_size = max(MIN_FRAME_CHUNK, -(-total // (workers * 4)))
+    render_options = {'stroke_width': stroke_width, 'dpi': dpi, 'dark_background': dark_background,
+                      'renderer': renderer}
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_frame_pool_context(),
+                             initializer=_init_frame_worker,
+                             initargs=(paths, colors, render_options, palette)) as pool:
+        # Keep a bounded window of chunks in flight so finished output is not piled up.
+        pending = deque()
+        for start in range(0, total, chunk_size):
+            pending.append(pool.submit(_encode_frame_range, start, min(start + chunk_size, total)))
+            if len(pending) > 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
 
 # --- HTML Template ---
 # Removed the "Collatz Input Value" field. A new "Summary" section is added next to the animation.
@@ -248,9 +631,11 @@ template = """
     #progressBar { width: 0%; height: 20px; background: #3498db; }
     #progressText { text-align: center; margin-top: 5px; }
     /* Animation result styling */
-    #result { display: flex; justify-content: space-around; align-items: flex-start; margin-top: 20px; }
+    #result { display: flex; flex-wrap: wrap; justify-content: space-around; align-items: flex-start; margin-top: 20px; }
     #result img { max-width: 60%; height: auto; border: 2px solid #ccc; }
     #summary { max-width: 35%; font-size: 1em; }
+    #profile { flex-basis: 100%; }
+    #profile pre { font-size: 0.8em; overflow-x: auto; }
     #downloadLink { display: inline-block; margin-top: 10px; padding: 8px 12px; background: #27ae60; color: #fff; text-decoration: none; border-radius: 5px; }
   </style>
 </head>
@@ -352,11 +737,61 @@ template = """
           <input type="checkbox" id="random_color_variation" name="random_color_variation">
           <p>(Each sequence gets a random color)</p>
         </div>
+        <div>
+          <label for="seed">Random Seed:</label>
+          <p>(Optional; repeats the same random colors)</p>
+          <input type="number" id="seed" name="seed" step="1">
+        </div>
         <div>
           <label for="low_quality">Low Quality Rendering:</label>
           <input type="checkbox" id="low_quality" name="low_quality">
           <p>(Faster preview)</p>
         </div>
+        <div>
+          <label for="max_frames">Max Frames:</label>
+          <p>(Optional; long animations draw several steps per frame)</p>
+          <input type="number" id="max_frames" name="max_frames" min="1" step="1">
+        </div>
+        <div>
+          <label for="target_duration">Target Duration (s):</label>
+          <p>(Optional; caps the animation length)</p>
+          <input type="number" id="target_duration" name="target_duration" min="0" step="0.1">
+        </div>
+        <div>
+          <label for="frame_budget">Frame Budget:</label>
+          <p>(How frames are shared between sequences)</p>
+          <select id="frame_budget" name="frame_budget">
+            <option value="even">Even (same steps per frame)</option>
+            <option value="short">Favor short sequences</option>
+          </select>
+        </div>
+        <div>
+          <label for="output_format">Output Format:</label>
+          <p>(SVG draws each path once; small and fast for long animations)</p>
+          <select id="output_format" name="output_format">
+            <option value="gif">GIF</option>
+            <option value="svg">Animated SVG</option>
+          </select>
+        </div>
+        <div>
+          <label for="renderer">Renderer:</label>
+          <p>(Raster draws without matplotlib; Matplotlib is the reference look)</p>
+          <select id="renderer" name="renderer">
+            <option value="matplotlib">Matplotlib</option>
+            <option value="raster">Raster</option>
+          </select>
+        </div>
+        {% if profiling_enabled %}
+        <div>
+          <label for="profile">Profiling:</label>
+          <p>(Shows where the time went; cProfile always renders, even if cached)</p>
+          <select id="profile" name="profile">
+            <option value="">Off</option>
+            <option value="stages">Stage breakdown</option>
+            <option value="cprofile">Stages and cProfile</option>
+          </select>
+        </div>
+        {% endif %}
         <div>
           <label for="dark_background">Dark Background:</label>
           <input type="checkbox" id="dark_background" name="dark_background">
@@ -396,118 +831,638 @@ template = """
   </div>
   
   <script>
-    // AJAX submission with progress bar update.
+    // AJAX submission: queue a render job, then poll its progress until the animation is ready.
+    var progressBar = document.getElementById("progressBar");
+    var progressText = document.getElementById("progressText");
+
+    function showError(error){
+      progressText.innerText = "Error: " + error.message;
+      console.error(error);
+    }
+
+    function formatStages(title, stages){
+      var lines = [title + ":"];
+      for (var name in stages) { lines.push("  " + name + ": " + stages[name].toFixed(3) + "s"); }
+      return lines.join("\n");
+    }
+
+    function showProfile(profile){
+      var text = formatStages("Request", profile.request);
+      if (profile.render) { text += "\n" + formatStages("Render", profile.render); }
+      if (profile.cprofile) { text += "\n\n" + profile.cprofile; }
+      var pre = document.createElement("pre");
+      pre.textContent = text;
+      var container = document.createElement("div");
+      container.id = "profile";
+      container.innerHTML = "<h3>Profile</h3>";
+      container.appendChild(pre);
+      document.getElementById("result").appendChild(container);
+    }
+
+    function showResult(job, profile){
+      var resultHTML = '<h2>Animation:</h2>' +
+                       '<div style="display: flex; justify-content: space-around; align-items: flex-start;">' +
+                       '<div id="animationContainer"><img id="animationImg" src="' + job.result_url + '" alt="Artful Animation"><br><br>' +
+                       '<a id="downloadLink" href="' + job.result_url + '" download="animation.' + job.format + '">Download Animation</a></div>' +
+                       '<div id="summary"><h3>Summary</h3><p>' + job.summary + '</p></div></div>';
+      document.getElementById("result").innerHTML = resultHTML;
+      if (profile) { showProfile(profile); }
+    }
+
+    function pollJob(job){
+      fetch(job.status_url)
+        .then(function(response){ return response.json(); })
+        .then(function(status){
+          if (status.status === "error") { throw new Error(status.error); }
+          var progress = status.frames_total ? Math.floor(100 * status.frames_done / status.frames_total) : 0;
+          progressBar.style.width = progress + "%";
+          progressText.innerText = progress + "% (" + status.frames_done + " / " + status.frames_total + " frames)";
+          if (status.status === "done") {
+            showResult(job, status.profile);
+          } else {
+            setTimeout(function(){ pollJob(job); }, 500);
+          }
+        })
+        .catch(showError);
+    }
+
     document.getElementById("animationForm").addEventListener("submit", function(e){
       e.preventDefault();
       document.getElementById("progressContainer").style.display = "block";
-      var progressBar = document.getElementById("progressBar");
-      var progressText = document.getElementById("progressText");
-      var progress = 0;
-      var interval = setInterval(function(){
-        if (progress < 90) {
-          progress++;
-          progressBar.style.width = progress + "%";
-          progressText.innerText = progress + "%";
-        }
-      }, 100);
+      progressBar.style.width = "0%";
+      progressText.innerText = "Queued...";
       
       var formData = new FormData(document.getElementById("animationForm"));
       fetch("/", { method: "POST", body: formData })
         .then(function(response){ return response.json(); })
-        .then(function(json){
-          clearInterval(interval);
-          progressBar.style.width = "100%";
-          progressText.innerText = "100%";
-          var resultHTML = '<h2>Animation:</h2>' +
-                           '<div style="display: flex; justify-content: space-around; align-items: flex-start;">' +
-                           '<div id="animationContainer"><img id="animationImg" src="data:image/gif;base64,' + json.gif_data + '" alt="Artful Animation"><br><br>' +
-                           '<a id="downloadLink" href="data:image/gif;base64,' + json.gif_data + '" download="animation.gif">Download Animation</a></div>' +
-                           '<div id="summary"><h3>Summary</h3><p>' + json.summary + '</p></div></div>';
-          document.getElementById("result").innerHTML = resultHTML;
+        .then(function(job){
+          if (job.error) { throw new Error(job.error); }
+          if (job.cached) {
+            progressBar.style.width = "100%";
+            progressText.innerText = "100% (cached)";
+            showResult(job, job.profile);
+          } else {
+            pollJob(job);
+          }
         })
-        .catch(function(error){
-          clearInterval(interval);
-          progressText.innerText = "Error!";
-          console.error(error);
-        });
+        .catch(showError);
     });
   </script>
 </body>
 </html>
 """
 
+# --- Render Jobs ---
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", 2))
+# "process" runs renders in worker processes; "thread" renders inside the web process.
+RENDER_EXECUTOR = os.environ.get("RENDER_EXECUTOR", "process")
+# Processes used to rasterize the frames of a single render (1 = serial).
+FRAME_WORKERS = int(os.environ.get("FRAME_WORKERS", 1))
+FRAME_CHUNK_SIZE = int(os.environ["FRAME_CHUNK_SIZE"]) if os.environ.get("FRAME_CHUNK_SIZE") else None
+# Encode GIFs against one global palette with delta frames (0 = adaptive palette per frame).
+# Animations with too many lines for one palette always get adaptive palettes.
+GIF_GLOBAL_PALETTE = os.environ.get("GIF_GLOBAL_PALETTE", "1") != "0"
+RENDER_CACHE_DIR = os.environ.get("RENDER_CACHE_DIR", "render_cache")
+# Bound on the whole cache directory, split evenly between the output formats.
+RENDER_CACHE_MAX_BYTES = int(os.environ.get("RENDER_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# Jobs allowed to wait behind the RENDER_WORKERS running ones before requests are turned away.
+RENDER_QUEUE_LIMIT = int(os.environ.get("RENDER_QUEUE_LIMIT", 8))
+LOW_QUALITY_DPI = 50
+# Output formats and their media types; GIFs are rasterized frame by frame.
+OUTPUT_FORMATS = {"gif": "image/gif", "svg": "image/svg+xml"}
+# Per-request profiling: "stages" times each step, "cprofile" also profiles the render.
+# Off unless PROFILING_ENABLED=1, since cProfiled requests always re-render.
+PROFILE_MODES = ("stages", "cprofile")
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+PROFILE_LINES = 30  # Functions listed in a cProfile summary
+
+def parse_render_params(form):
+    """Read the animation settings from the submitted form."""
+    low_quality = form.get('low_quality') == 'on'
+    seed = form.get('seed', '')
+    renderer = form.get('renderer', 'matplotlib')
+    if renderer not in RENDERERS:
+        raise ValueError("Unknown renderer.")
+    output_format = form.get('output_format', 'gif')
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError("Unknown output format.")
+    frame_budget = form.get('frame_budget', 'even')
+    if frame_budget not in FRAME_BUDGETS:
+        raise ValueError("Unknown frame budget.")
+    cap = int(form.get('cap', 5))
+    if cap < 1:
+        raise ValueError("The cap must be at least 1 term.")
+    max_frames = form.get('max_frames', '')
+    target_duration = form.get('target_duration', '')
+    return {
+        'series_type': form.get('series_type', 'fibonacci').lower(),
+        'cap': cap,
+        'cmap_name': form.get('colormap', 'viridis'),
+        'step_length': float(form.get('step_length', 10)),
+        'stroke_width': float(form.get('stroke_width', 3)),
+        'left_angle': float(form.get('left_angle', 30)),
+        'right_angle': float(form.get('right_angle', 45)),
+        'custom_transform': form.get('custom_transform') == 'on',
+        'left_mod': float(form.get('left_mod', 180)),
+        'right_mod': float(form.get('right_mod', 180)),
+        'consecutive_increment': form.get('consecutive_increment') == 'on',
+        'variable_step': form.get('variable_step') == 'on',
+        'rotation_drift': float(form.get('rotation_drift', 0)),
+        'symmetry_mirror': form.get('symmetry_mirror', 'None'),
+        'random_color_variation': form.get('random_color_variation') == 'on',
+        'dark_background': form.get('dark_background') == 'on',
+        'dpi': LOW_QUALITY_DPI if low_quality else 100,
+        'seed': int(seed) if seed.strip() else None,
+        'renderer': renderer,
+        'output_format': output_format,
+        'max_frames': int(max_frames) if max_frames.strip() else None,
+        'target_duration': float(target_duration) if target_duration.strip() else None,
+        'frame_budget': frame_budget,
+    }
+
+def frame_plan(lengths, params):
+    """Steps that get a frame for each sequence, from the Collatz lengths of the main series."""
+    return budget_frames(lengths, params['max_frames'],
+                         params['target_duration'], params['frame_budget'])
+
+def build_summary(params, lengths):
+    # Summary of settings (excluding visual style details like color or stroke)
+    summary_lines = []
+    summary_lines.append(f"Series Type: {params['series_type'].capitalize()} ({params['cap']} terms)")
+    if params['custom_transform']:
+        summary_lines.append(f"Angle Logic: Custom transform (Left mod: {params['left_mod']}, Right mod: {params['right_mod']})")
+    elif params['consecutive_increment']:
+        summary_lines.append(f"Angle Logic: Consecutive increment with fixed angles (Left: {params['left_angle']}°, Right: {params['right_angle']}°)")
+    else:
+        summary_lines.append(f"Angle Logic: Fixed (Left: {params['left_angle']}°, Right: {params['right_angle']}°)")
+    if params['variable_step']:
+        summary_lines.append("Variable step length enabled")
+    if params['rotation_drift'] != 0:
+        summary_lines.append(f"Rotation drift: {params['rotation_drift']}° per step")
+    if params['symmetry_mirror'] != "None":
+        summary_lines.append(f"Symmetry Mirror: {params['symmetry_mirror']}")
+    steps = sum(lengths)
+    frames = expected_frame_count(lengths, params)
+    if frames < steps:
+        summary_lines.append(f"Frame budget: {steps / frames:.1f} steps per frame "
+                             f"({steps} steps in {frames} frames)")
+    # (Other toggles like random color, dark background, or low quality can be omitted from summary)
+    return "<br>".join(summary_lines)
+
+def expected_frame_count(lengths, params):
+    # One frame per planned Collatz step; holds extend the last frame instead of adding frames.
+    return sum(len(frames) for frames in frame_plan(lengths, params))
+
+def _with_progress(frames, report, total):
+    for done, item in enumerate(frames, 1):
+        yield item
+        # Resumed once the consumer has encoded the frame.
+        report(done, total)
+
+def _timed_frames(frames, stages):
+    # Time spent producing frames; the rest of the write loop is encoding.
+    start = time.perf_counter()
+    for item in frames:
+        stages['frames'] += time.perf_counter() - start
+        yield item
+        start = time.perf_counter()
+    stages['frames'] += time.perf_counter() - start
+
+def _profile_summary(profiler):
+    import pstats
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).strip_dirs().sort_stats("cumulative").print_stats(PROFILE_LINES)
+    return out.getvalue()
+
+def render_animation(params, path, report=None, profile=None):
+    """
+    Render the animation described by params (see parse_render_params) to
+    path in the requested output format. If given, report(done, total) is
+    called after each encoded frame.
+
+    Returns the render's statistics: frames, output_bytes and the seconds
+    spent in each stage. With profile="cprofile" the render runs under
+    cProfile and a summary of the slowest calls is added; frames rendered by
+    FRAME_WORKERS processes only show up as time spent waiting on them.
+    """
+    stages = {}
+    profiler = None
+    if profile == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        frames = _render_animation(params, path, report, stages)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+    stages['total'] = time.perf_counter() - start
+    stats = {"frames": frames, "output_bytes": os.path.getsize(path), "stages": stages}
+    if profiler is not None:
+        stats["cprofile"] = _profile_summary(profiler)
+    return stats
+
+def _render_animation(params, path, report, stages):
+    # Stages: series and collatz, then frames and encode for GIFs, write for SVGs.
+    # The collatz stage covers the store lookup (walking any new trajectories);
+    # the sequences themselves are rebuilt once, with the geometry.
+    start = time.perf_counter()
+    main_series = generate_series(params['series_type'], params['cap'])
+    stages['series'] = time.perf_counter() - start
+    start = time.perf_counter()
+    lengths = collatz_cache.lengths(main_series)
+    stages['collatz'] = time.perf_counter() - start
+    total = expected_frame_count(lengths, params)
+    options = {k: v for k, v in params.items() if k not in ('series_type', 'cap', 'output_format')}
+    if params['output_format'] == 'svg':
+        options.pop('renderer')
+        start = time.perf_counter()
+        with open(path, 'w', encoding='utf-8') as svg_file:
+            write_turtle_svg(main_series, svg_file, **options)
+        stages['write'] = time.perf_counter() - start
+        if report is not None:
+            report(total, total)
+        return total
+    palette = None
+    if GIF_GLOBAL_PALETTE:
+        if options['random_color_variation'] and options['seed'] is None:
+            # The palette and the frames must draw the same random colors.
+            options['seed'] = random.randrange(2 ** 32)
+        palette = animation_palette(len(main_series), options['cmap_name'], options['dark_background'],
+                                    options['random_color_variation'], options['seed'])
+    encoded = FRAME_WORKERS > 1
+    if encoded:
+        frames = encode_animation_parallel(main_series, workers=FRAME_WORKERS, palette=palette,
+                                           chunk_size=FRAME_CHUNK_SIZE, **options)
+    else:
+        frames = generate_combined_turtle_animation(main_series, **options)
+    stages['frames'] = 0.0
+    frames = _timed_frames(frames, stages)
+    if report is not None:
+        frames = _with_progress(frames, report, total)
+    start = time.perf_counter()
+    with open(path, 'wb') as gif_file:
+        written = write_gif(frames, gif_file, encoded=encoded, palette=palette)
+    stages['encode'] = time.perf_counter() - start - stages['frames']
+    return written
+
+def render_cache_key(params):
+    """Cache key for params, or None when the output is not reproducible."""
+    if params['random_color_variation'] and params['seed'] is None:
+        return None
+    if not params['random_color_variation']:
+        # The seed only picks random colors; identical renders share one key.
+        params = dict(params, seed=None)
+    if params['output_format'] == 'gif':
+        # The palette mode changes the encoded bytes, so renders in each mode are kept apart.
+        params = dict(params, global_palette=GIF_GLOBAL_PALETTE)
+    return params_key(params)
+
+def _store_render(path, info, stats):
+    fmt = info["output_format"]
+    record_render(fmt, stats)
+    if "profile" in info:
+        info["profile"]["render"] = {name: round(seconds, 4) for name, seconds in stats["stages"].items()}
+        if "cprofile" in stats:
+            info["profile"]["cprofile"] = stats["cprofile"]
+    key = info.get("cache_key")
+    return render_caches[fmt].put(key, path) if key else path
+
+# One cache per output format, sharing the directory and RENDER_CACHE_MAX_BYTES.
+render_caches = {fmt: RenderCache(RENDER_CACHE_DIR, RENDER_CACHE_MAX_BYTES // len(OUTPUT_FORMATS),
+                                  suffix="." + fmt)
+                 for fmt in OUTPUT_FORMATS}
+render_jobs = RenderJobQueue(render_animation, max_workers=RENDER_WORKERS,
+                             on_complete=_store_render, max_queued=RENDER_QUEUE_LIMIT,
+                             executor=RENDER_EXECUTOR,
+                             # Workers fork from a fork server that has run warm_up().
+                             preload=["render_worker"],
+                             # Job outputs are moved into the cache, so keep them on its filesystem.
+                             result_root=os.path.join(RENDER_CACHE_DIR, "jobs"))
+
+# --- Admission Control ---
+RENDER_MAX_CAP = int(os.environ.get("RENDER_MAX_CAP", 200))
+RENDER_MAX_PIXELS = int(float(os.environ.get("RENDER_MAX_PIXELS", 4e9)))
+RENDER_MAX_SECONDS = float(os.environ.get("RENDER_MAX_SECONDS", 120))
+RENDER_MAX_MEMORY = int(os.environ.get("RENDER_MAX_MEMORY", 1024 ** 3))
+# Over-budget renders are either "downgrade"d (lower dpi, then fewer frames) or "reject"ed.
+RENDER_OVER_BUDGET = os.environ.get("RENDER_OVER_BUDGET", "downgrade")
+# Cost model constants, measured on the matplotlib backend.
+PROCESS_BASE_BYTES = 96 * 1024 * 1024  # Interpreter, NumPy and matplotlib per render process
+FRAME_BUFFERS = 5  # Frame-sized RGBA buffers alive per rendering process
+POINT_BYTES = 256  # Geometry plus Collatz store entry per path point
+STORE_BYTES_PER_LOG_BYTE = 4  # Memory of a loaded Collatz store per byte of its log
+PIXELS_PER_SECOND = 1e8  # Rasterize + delta-encode throughput against a global palette
+ADAPTIVE_PIXELS_PER_SECOND = 6e6  # Rasterize + encode with an adaptive palette per frame
+DRAWN_POINTS_PER_SECOND = 5e5  # Line vertices drawn, summed over every frame
+FRAME_CAP_ATTEMPTS = 5  # Frame caps tried when downgrading to fit RENDER_MAX_SECONDS
+SVG_POINTS_PER_SECOND = 1e5
+
+class RenderRejected(Exception):
+    """A render turned away by admission control; carries the admission decision."""
+
+    def __init__(self, message, admission, status=413):
+        super().__init__(message)
+        self.admission = admission
+        self.status = status
+
+def loaded_store_bytes():
+    """Rough memory a process holds once it has loaded the Collatz store, from its log size."""
+    try:
+        return os.path.getsize(collatz_cache.path) * STORE_BYTES_PER_LOG_BYTE
+    except FileNotFoundError:
+        return 0
+
+def estimate_render_cost(lengths, params):
+    """
+    Predict the cost of a render before it starts, from the Collatz lengths
+    of the main series, the frame plan and the dpi: frames, pixels rasterized
+    in total, peak_bytes across the render's processes and rough seconds.
+    Every render process holds the loaded Collatz store on top of its own
+    geometry. GIF seconds count the pixels at the throughput of the palette
+    the render will use, plus the line vertices drawn over all frames.
+    """
+    plan = frame_plan(lengths, params)
+    frames = sum(len(steps) for steps in plan)
+    points = sum(lengths) + len(lengths)
+    process_bytes = PROCESS_BASE_BYTES + loaded_store_bytes() + points * POINT_BYTES
+    if params['output_format'] == 'svg':
+        return {"frames": frames, "pixels": 0,
+                "peak_bytes": process_bytes,
+                "seconds": round(points / SVG_POINTS_PER_SECOND, 1)}
+    side = int(FIGURE_INCHES * params['dpi'])
+    pixels = frames * side * side
+    # Parallel renders add one process per frame worker, each with its own canvas and geometry.
+    canvases = FRAME_WORKERS if FRAME_WORKERS > 1 else 1
+    processes = canvases + (FRAME_WORKERS > 1)
+    peak_bytes = (processes * process_bytes
+                  + canvases * FRAME_BUFFERS * side * side * 4)
+    # Each frame draws the finished sequences and the current one up to its step.
+    drawn = 0
+    finished = 0
+    for length, steps in zip(lengths, plan):
+        drawn += len(steps) * (finished + 2) + int(np.sum(steps))
+        finished += length + 1
+    throughput = PIXELS_PER_SECOND if uses_global_palette(len(lengths)) else ADAPTIVE_PIXELS_PER_SECOND
+    seconds = pixels / throughput + drawn / DRAWN_POINTS_PER_SECOND
+    return {"frames": frames, "pixels": pixels, "peak_bytes": peak_bytes,
+            "seconds": round(seconds, 1)}
+
+def _budget_problems(estimate):
+    problems = []
+    if estimate['pixels'] > RENDER_MAX_PIXELS:
+        problems.append(f"{estimate['pixels'] / 1e9:.1f} Gpx to rasterize "
+                        f"(limit {RENDER_MAX_PIXELS / 1e9:.1f} Gpx)")
+    if estimate['peak_bytes'] > RENDER_MAX_MEMORY:
+        problems.append(f"{estimate['peak_bytes'] / 2**20:.0f} MiB of memory "
+                        f"(limit {RENDER_MAX_MEMORY / 2**20:.0f} MiB)")
+    if estimate['seconds'] > RENDER_MAX_SECONDS:
+        problems.append(f"about {estimate['seconds']:.0f} s of rendering "
+                        f"(limit {RENDER_MAX_SECONDS:.0f} s)")
+    return problems
+
+def admit_render(params):
+    """
+    Check a render against the budget before it is queued. Returns
+    (params, lengths, admission). lengths are the Collatz lengths of the main
+    series, looked up once here so the summary can reuse them. params is a
+    downgraded copy (lower dpi, then a frame cap) when the render only fits
+    that way and downgrading is enabled. admission records the decision, the
+    estimate and any changes.
+    Raises RenderRejected when the render cannot be made to fit.
+    """
+    if params['cap'] > RENDER_MAX_CAP:
+        reason = f"A cap of {params['cap']} terms exceeds the limit of {RENDER_MAX_CAP}."
+        raise RenderRejected(reason, {"decision": "rejected", "reason": reason})
+    lengths = collatz_cache.lengths(generate_series(params['series_type'], params['cap']))
+    estimate = estimate_render_cost(lengths, params)
+    admission = {"decision": "accepted", "estimate": estimate, "changes": {}}
+    problems = _budget_problems(estimate)
+    if not problems:
+        return params, lengths, admission
+    if RENDER_OVER_BUDGET == "downgrade" and params['output_format'] == 'gif':
+        downgraded = dict(params)
+        changes = {}
+        if downgraded['dpi'] > LOW_QUALITY_DPI:
+            downgraded['dpi'] = changes['dpi'] = LOW_QUALITY_DPI
+            estimate = estimate_render_cost(lengths, downgraded)
+        if estimate['pixels'] > RENDER_MAX_PIXELS or estimate['seconds'] > RENDER_MAX_SECONDS:
+            side = int(FIGURE_INCHES * downgraded['dpi'])
+            max_frames = RENDER_MAX_PIXELS // (side * side)
+            if downgraded['max_frames'] is not None:
+                max_frames = min(max_frames, downgraded['max_frames'])
+            for _ in range(FRAME_CAP_ATTEMPTS):
+                downgraded['max_frames'] = changes['max_frames'] = max_frames
+                estimate = estimate_render_cost(lengths, downgraded)
+                if estimate['seconds'] <= RENDER_MAX_SECONDS or estimate['frames'] <= len(lengths):
+                    break
+                # Seconds grow about linearly with frames.
+                max_frames = min(max_frames - 1,
+                                 int(estimate['frames'] * RENDER_MAX_SECONDS / estimate['seconds']))
+        problems = _budget_problems(estimate)
+        if not problems:
+            admission.update(decision="downgraded", estimate=estimate, changes=changes,
+                             requested_estimate=admission['estimate'])
+            return downgraded, lengths, admission
+    reason = "Render exceeds the budget: needs " + " and ".join(problems) + "."
+    admission.update(decision="rejected", reason=reason)
+    raise RenderRejected(reason, admission)
+
+# --- Metrics ---
+# Exposed at /metrics in the Prometheus text format. Render statistics come
+# back from the workers with each finished job; Collatz lookups are those of
+# the web process, which makes the first lookup of every render at admission.
+metrics = Registry()
+http_requests = metrics.counter("collatz_http_requests_total", "HTTP requests handled.",
+                                ("endpoint", "method", "status"))
+http_request_seconds = metrics.histogram("collatz_http_request_seconds",
+                                         "Time to handle an HTTP request.", ("endpoint",))
+http_response_bytes = metrics.histogram("collatz_http_response_bytes", "HTTP response body sizes.",
+                                        ("endpoint",), buckets=SIZE_BUCKETS)
+render_admissions = metrics.counter("collatz_render_admissions_total",
+                                    "Admission control decisions.", ("decision",))
+metrics.counter("collatz_render_jobs_total", "Render jobs finished.", ("outcome",),
+                fn=lambda: {("done",): render_jobs.completed, ("error",): render_jobs.failed})
+metrics.gauge("collatz_render_jobs_pending", "Render jobs queued or running.",
+              fn=lambda: {(): render_jobs.pending()})
+render_stage_seconds = metrics.histogram("collatz_render_stage_seconds",
+                                         "Time spent in each stage of a render.", ("format", "stage"))
+frames_per_render = metrics.histogram("collatz_render_frames", "Frames per render.", ("format",),
+                                      buckets=COUNT_BUCKETS)
+render_output_bytes = metrics.histogram("collatz_render_output_bytes", "Size of rendered files.",
+                                        ("format",), buckets=SIZE_BUCKETS)
+for _stat in ("hits", "misses", "evictions"):
+    metrics.counter(f"collatz_render_cache_{_stat}_total", f"Render cache {_stat}.", ("format",),
+                    fn=lambda stat=_stat: {(fmt,): cache.stats()[stat] for fmt, cache in render_caches.items()})
+metrics.gauge("collatz_render_cache_bytes", "Bytes held in the render cache.", ("format",),
+              fn=lambda: {(fmt,): cache.stats()["bytes"] for fmt, cache in render_caches.items()})
+metrics.counter("collatz_store_lookups_total", "Collatz store lookups by the web process.", ("result",),
+                fn=lambda: {("hit",): collatz_cache.hits, ("miss",): collatz_cache.misses})
+metrics.gauge("collatz_store_entries", "Numbers known to the Collatz store.",
+              fn=lambda: {(): len(collatz_cache)})
+
+def record_render(fmt, stats):
+    """Add a finished render's statistics (see render_animation) to the metrics."""
+    for stage, seconds in stats["stages"].items():
+        render_stage_seconds.observe(seconds, format=fmt, stage=stage)
+    frames_per_render.observe(stats["frames"], format=fmt)
+    render_output_bytes.observe(stats["output_bytes"], format=fmt)
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    endpoint = request.endpoint or "unmatched"
+    http_requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    http_request_seconds.observe(time.perf_counter() - g.request_start, endpoint=endpoint)
+    if response.content_length is not None:
+        http_response_bytes.observe(response.content_length, endpoint=endpoint)
+    return response
+
+def _send_render(path, etag=None):
+    fmt = os.path.splitext(path)[1][1:]
+    response = send_file(path, mimetype=OUTPUT_FORMATS[fmt], download_name='animation.' + fmt,
+                         etag=etag or True, conditional=True)
+    if etag:
+        # Content-addressed: the same key always names the same bytes.
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = 86400
+    return response
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
         try:
-            series_type = request.form.get('series_type', 'fibonacci')
-            cap = int(request.form.get('cap', 5))
-            colormap = request.form.get('colormap', 'viridis')
-            step_length = float(request.form.get('step_length', 10))
-            stroke_width = float(request.form.get('stroke_width', 3))
-            left_angle = float(request.form.get('left_angle', 30))
-            right_angle = float(request.form.get('right_angle', 45))
-            custom_transform = request.form.get('custom_transform') == 'on'
-            left_mod = float(request.form.get('left_mod', 180))
-            right_mod = float(request.form.get('right_mod', 180))
-            consecutive_increment = request.form.get('consecutive_increment') == 'on'
-            variable_step = request.form.get('variable_step') == 'on'
-            rotation_drift = float(request.form.get('rotation_drift', 0))
-            symmetry_mirror = request.form.get('symmetry_mirror', 'None')
-            random_color_variation = request.form.get('random_color_variation') == 'on'
-            low_quality = request.form.get('low_quality') == 'on'
-            dark_background = request.form.get('dark_background') == 'on'
-            
-            # Generate main series from the selected type
-            main_series = generate_series(series_type, cap)
-            dpi = 50 if low_quality else 100
-            
-            frames = generate_combined_turtle_animation(
-                main_series,
-                left_angle,
-                right_angle,
-                step_length=step_length,
-                stroke_width=stroke_width,
-                dpi=dpi,
-                custom_transform=custom_transform,
-                left_mod=left_mod,
-                right_mod=right_mod,
-                cmap_name=colormap,
-                dark_background=dark_background,
-                consecutive_increment=consecutive_increment,
-                variable_step=variable_step,
-                rotation_drift=rotation_drift,
-                symmetry_mirror=symmetry_mirror,
-                random_color_variation=random_color_variation
-            )
-            gif_buf = io.BytesIO()
-            imageio.mimsave(gif_buf, frames, format='GIF', duration=0.1)
-            gif_buf.seek(0)
-            gif_data = base64.b64encode(gif_buf.getvalue()).decode('utf-8')
-            
-            # Build summary of settings (excluding visual style details like color or stroke)
-            summary_lines = []
-            summary_lines.append(f"Series Type: {series_type.capitalize()} ({cap} terms)")
-            if custom_transform:
-                summary_lines.append(f"Angle Logic: Custom transform (Left mod: {left_mod}, Right mod: {right_mod})")
-            elif consecutive_increment:
-                summary_lines.append(f"Angle Logic: Consecutive increment with fixed angles (Left: {left_angle}°, Right: {right_angle}°)")
-            else:
-                summary_lines.append(f"Angle Logic: Fixed (Left: {left_angle}°, Right: {right_angle}°)")
-            if variable_step:
-                summary_lines.append("Variable step length enabled")
-            if rotation_drift != 0:
-                summary_lines.append(f"Rotation drift: {rotation_drift}° per step")
-            if symmetry_mirror != "None":
-                summary_lines.append(f"Symmetry Mirror: {symmetry_mirror}")
-            # (Other toggles like random color, dark background, or low quality can be omitted from summary)
-            summary = "<br>".join(summary_lines)
-            
-            return jsonify({"gif_data": gif_data, "summary": summary})
+            params = parse_render_params(request.form)
+            profile = request.form.get('profile', '')
+            if profile and profile not in PROFILE_MODES:
+                raise ValueError("Unknown profile mode.")
+            if profile and not PROFILING_ENABLED:
+                raise ValueError("Profiling is disabled on this server.")
+            stages = {}
+            start = time.perf_counter()
+            # Generates the main series and checks the render against the budget
+            params, lengths, admission = admit_render(params)
+            stages['admission'] = time.perf_counter() - start
+            start = time.perf_counter()
+            summary = build_summary(params, lengths)
+            if admission['changes']:
+                changes = ", ".join(f"{name} {value}" for name, value in admission['changes'].items())
+                summary += f"<br>Downgraded to fit the render budget: {changes}"
+            stages['summary'] = time.perf_counter() - start
+            fmt = params['output_format']
+            key = render_cache_key(params)
+            # A cProfiled request always renders, so there is a render to profile.
+            if key and profile != "cprofile" and render_caches[fmt].get(key):
+                render_admissions.inc(decision=admission['decision'])
+                response = {
+                    "cached": True,
+                    "format": fmt,
+                    "result_url": url_for('cached_render', key=key, fmt=fmt),
+                    "summary": summary,
+                    "admission": admission,
+                }
+                if profile:
+                    response["profile"] = {"mode": profile, "request": {
+                        name: round(seconds, 4) for name, seconds in stages.items()}}
+                return jsonify(response)
+            info = {"summary": summary, "cache_key": key, "output_format": fmt}
+            if profile:
+                # The job's status gains the render stages (and cProfile output) when it finishes.
+                info["profile"] = {"mode": profile, "request": {}}
+            try:
+                start = time.perf_counter()
+                job_id = render_jobs.submit(params, admission['estimate']['frames'], info=info,
+                                            suffix="." + fmt, options={"profile": profile or None})
+                stages['submit'] = time.perf_counter() - start
+            except QueueFull as e:
+                admission.update(decision="rejected", reason=str(e))
+                raise RenderRejected(str(e), admission, status=503)
+            render_admissions.inc(decision=admission['decision'])
+            response = {
+                "cached": False,
+                "format": fmt,
+                "job_id": job_id,
+                "status_url": url_for('job_status', job_id=job_id),
+                "result_url": url_for('job_result', job_id=job_id),
+                "summary": summary,
+                "admission": admission,
+            }
+            if profile:
+                info["profile"]["request"].update((name, round(seconds, 4)) for name, seconds in stages.items())
+                response["profile"] = dict(info["profile"])
+            return jsonify(response)
+        except RenderRejected as e:
+            render_admissions.inc(decision="rejected")
+            return jsonify({"error": str(e), "admission": e.admission}), e.status
         except Exception as e:
             return jsonify({"error": str(e)})
     else:
-        return render_template_string(template, gif_data=None)
+        return render_template_string(template, gif_data=None, profiling_enabled=PROFILING_ENABLED)
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    status = render_jobs.status(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown job."}), 404
+    return jsonify(status)
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    path = render_jobs.result_path(job_id)
+    if path is None or not os.path.exists(path):
+        return jsonify({"error": "Result not available."}), 404
+    return _send_render(path, etag=render_jobs.status(job_id).get("cache_key"))
+
+@app.route('/renders/<key>.<fmt>')
+def cached_render(key, fmt):
+    if fmt not in render_caches:
+        return jsonify({"error": "Unknown output format."}), 404
+    path = render_caches[fmt].get(key, count=False)
+    if path is None:
+        return jsonify({"error": "Render not cached."}), 404
+    return _send_render(path, etag=key)
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify({fmt: cache.stats() for fmt, cache in render_caches.items()})
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.exposition(), mimetype="text/plain; version=0.0.4")
+
+# --- Warm-up ---
+# Set WARM_UP=1 to warm up at import, e.g. for `gunicorn --preload creating_patterns:app`.
+WARM_UP = os.environ.get("WARM_UP", "0") == "1"
+
+def warm_up():
+    """
+    Do ahead of time what the first request would otherwise pay for: import
+    matplotlib, read the Collatz store and the render caches, and draw one
+    throwaway frame so fonts and the Agg backend are set up. Run it in a
+    pre-fork server's master before the workers fork, so they share the
+    loaded pages copy-on-write; gc.freeze() keeps the collector from
+    touching, and so copying, those pages later. Render worker processes
+    fork from a fork server that runs warm_up() itself (see render_worker).
+    """
+    collatz_cache.load()
+    for cache in render_caches.values():
+        cache.load()
+    canvas = MatplotlibCanvas(LOW_QUALITY_DPI, background_color(False))
+    try:
+        canvas.add_line([0, 1], [0, 1], path_colors(1)[0], FINISHED_LINE_WIDTH, FINISHED_LINE_ALPHA)
+        canvas.set_limits(0, 1, 0, 1)
+        canvas.capture()
+    finally:
+        canvas.close()
+    gc.freeze()
+
+if WARM_UP:
+    warm_up()
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    app.run(debug=True, threaded=True)
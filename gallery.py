@@ -0,0 +1,251 @@
+"""
+Render a gallery of animations offline from a parameter grid.
+
+The grid uses the form fields the web form posts (see parse_render_params).
+It is either JSON or CSV:
+  - JSON: an object mapping fields to a value or a list of values, expanded
+    to every combination, or a list of such objects. Checkboxes take true or
+    false, and null means the default.
+  - CSV: one animation per row, with field names in the header. Checkboxes
+    take "on", and an empty cell means the default.
+
+Every animation is rendered headless in a process pool. Where the platform
+can fork, the pool forks from a parent that has already generated the series
+and looked up their Collatz trajectories, so workers share that work
+copy-on-write; elsewhere workers start fresh and reload the store. Either
+way, workers are pointed at the parent's Collatz store file, and new entries
+go through it. Outputs are named by the hash of
+their parameters, and outputs already present in the output directory are
+skipped. manifest.json lists every animation in the grid with its file,
+parameters and timings.
+
+Run from the repository root:
+    python gallery.py grid.json --out gallery [--workers 4] [--force]
+"""
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import creating_patterns
+from collatz_store import CollatzStore
+from creating_patterns import (generate_series, parse_render_params, render_animation, render_cache_key,
+                               warm_up)
+from render_cache import params_key
+
+MANIFEST_NAME = "manifest.json"
+
+
+# --- Grid ---
+def form_fields():
+    """Names of the form fields parse_render_params reads."""
+    seen = set()
+
+    class Form(dict):
+        def get(self, name, default=None):
+            seen.add(name)
+            return default
+
+    parse_render_params(Form())
+    return seen
+
+
+def _form_value(value):
+    # JSON grids use true/false for checkboxes; the form sends "on" or nothing.
+    if value is True:
+        return "on"
+    if value is False:
+        return ""
+    return str(value)
+
+
+def _expand(spec):
+    fields = list(spec)
+    choices = [value if isinstance(value, list) else [value] for value in spec.values()]
+    for combination in itertools.product(*choices):
+        # null leaves the field out, like an empty CSV cell.
+        yield {field: _form_value(value) for field, value in zip(fields, combination)
+               if value is not None}
+
+
+def _read_csv(f, path):
+    forms = []
+    # Line 1 is the header.
+    for line, row in enumerate(csv.DictReader(f), 2):
+        if None in row:
+            raise ValueError(f"{path} line {line}: {len(row[None])} more cells than the header has fields")
+        forms.append({field: value for field, value in row.items() if value})
+    return forms
+
+
+def read_grid(path):
+    """Read a JSON or CSV grid file into a list of form dicts."""
+    with open(path, newline="") as f:
+        if path.lower().endswith(".csv"):
+            forms = _read_csv(f, path)
+        else:
+            spec = json.load(f)
+            specs = spec if isinstance(spec, list) else [spec]
+            for i, spec in enumerate(specs, 1):
+                if not isinstance(spec, dict):
+                    raise ValueError(f"{path} entry {i}: expected an object of fields, got {json.dumps(spec)}")
+            forms = [form for spec in specs for form in _expand(spec)]
+    known = form_fields()
+    unknown = sorted({field for form in forms for field in form} - known)
+    if unknown:
+        raise ValueError(f"Unknown fields in {path}: {', '.join(unknown)}")
+    return forms
+
+
+def plan_jobs(forms):
+    """
+    Parse every form into render params keyed by their hash, dropping
+    duplicates. Random colors without a seed get one derived from the other
+    parameters, so every output is reproducible and can be skipped next time.
+    Raises ValueError naming the first form that does not parse.
+    """
+    jobs = {}
+    for i, form in enumerate(forms, 1):
+        try:
+            params = parse_render_params(form)
+        except ValueError as e:
+            raise ValueError(f"Grid animation {i} ({json.dumps(form, sort_keys=True)}): {e}") from e
+        if params['random_color_variation'] and params['seed'] is None:
+            params['seed'] = int(params_key(params)[:8], 16)
+        key = render_cache_key(params)
+        jobs.setdefault(key, {"key": key, "form": form, "params": params})
+    return list(jobs.values())
+
+
+# --- Rendering ---
+def _render_job(params, path):
+    """Render one animation in a worker; returns its timings or the error."""
+    start = time.perf_counter()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        stats = render_animation(params, tmp_path)
+        # Renamed into place once complete, so a present output is always whole.
+        os.replace(tmp_path, path)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return {"status": "error", "error": f"{type(e).__name__}: {e}",
+                "seconds": round(time.perf_counter() - start, 3)}
+    return {"status": "rendered", "seconds": round(time.perf_counter() - start, 3),
+            "frames": stats["frames"], "output_bytes": stats["output_bytes"],
+            "stages": {name: round(seconds, 4) for name, seconds in stats["stages"].items()},
+            "worker": os.getpid()}
+
+
+def _init_worker(store_path):
+    # A spawned worker imports the app afresh, with its default store.
+    if creating_patterns.collatz_cache.path != store_path:
+        creating_patterns.collatz_cache = CollatzStore(store_path)
+
+
+def _pool_context():
+    # Forking shares the parent's filled memo and store; not every platform can.
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def _prepare(jobs):
+    # Fill the series memo and the Collatz store once, before the workers fork.
+    for job in jobs:
+        params = job["params"]
+        creating_patterns.collatz_cache.sequences(generate_series(params['series_type'], params['cap']))
+    warm_up()
+
+
+def _load_manifest(path):
+    try:
+        with open(path) as f:
+            return {job["key"]: job for job in json.load(f)["jobs"]}
+    except (FileNotFoundError, ValueError, KeyError):
+        return {}
+
+
+def render_gallery(forms, out_dir, workers=None, force=False):
+    """
+    Render every form into out_dir and write the manifest; returns it.
+    Outputs already in out_dir are skipped unless force is set.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    previous = _load_manifest(manifest_path)
+    jobs = plan_jobs(forms)
+    todo = []
+    for job in jobs:
+        job["file"] = f"{job['key']}.{job['params']['output_format']}"
+        path = os.path.join(out_dir, job["file"])
+        if os.path.exists(path) and not force:
+            # Keep the timings of the run that rendered it.
+            earlier = previous.get(job["key"], {})
+            job.update({name: earlier[name] for name in ("seconds", "frames", "stages", "rendered_at")
+                        if name in earlier})
+            job.update(status="skipped", output_bytes=os.path.getsize(path))
+        else:
+            todo.append(job)
+    print(f"{len(jobs)} animations, {len(jobs) - len(todo)} already rendered", file=sys.stderr)
+
+    start = time.perf_counter()
+    if todo:
+        _prepare(todo)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(),
+                                 initializer=_init_worker,
+                                 initargs=(creating_patterns.collatz_cache.path,)) as pool:
+            futures = {pool.submit(_render_job, job["params"], os.path.join(out_dir, job["file"])): job
+                       for job in todo}
+            for done, future in enumerate(as_completed(futures), 1):
+                job = futures[future]
+                job.update(future.result())
+                if job["status"] == "rendered":
+                    job["rendered_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+                print(f"[{done}/{len(todo)}] {job['file']}: {job['status']} in {job['seconds']:.1f}s"
+                      + (f" ({job['error']})" if job["status"] == "error" else ""), file=sys.stderr)
+
+    statuses = [job["status"] for job in jobs]
+    manifest = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "workers": workers or os.cpu_count(),
+        "seconds": round(time.perf_counter() - start, 3),
+        "counts": {status: statuses.count(status) for status in ("rendered", "skipped", "error")},
+        "jobs": jobs,
+    }
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("grid", help="JSON or CSV parameter grid")
+    parser.add_argument("--out", default="gallery", help="output directory (default: gallery)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="render processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="re-render outputs that already exist")
+    parser.add_argument("--collatz-store", default=None,
+                        help="Collatz store file to share (default: the app's)")
+    args = parser.parse_args()
+    if args.collatz_store:
+        creating_patterns.collatz_cache = CollatzStore(args.collatz_store)
+    try:
+        forms = read_grid(args.grid)
+        plan_jobs(forms)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    manifest = render_gallery(forms, args.out, args.workers, args.force)
+    counts = manifest["counts"]
+    print(f"{counts['rendered']} rendered, {counts['skipped']} skipped, {counts['error']} failed "
+          f"in {manifest['seconds']:.1f}s; manifest at {os.path.join(args.out, MANIFEST_NAME)}")
+    sys.exit(1 if counts["error"] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+import struct
+
+import numpy as np
+from PIL import Image, GifImagePlugin
+
+TRANSPARENT_INDEX = 255  # Global palette slot reserved for unchanged pixels
+MAX_PALETTE_COLORS = 255
+PALETTE_RAMP_LEVELS = 16
+# Fewer blend levels per color than this band visibly; ramp_palette gives up instead.
+MIN_PALETTE_RAMP_LEVELS = 6
+
+
+class GifStreamWriter:
+    """
+    Write an animated GIF one frame at a time.
+
+    Every appended frame is quantized and LZW-encoded straight into the output
+    file, so memory use stays at one frame no matter how long the animation
+    is. Without a palette, frames carry their own adaptive local color table
+    and the header has none. With a global palette (see ramp_palette) it is
+    written once in the header and frames are delta-encoded by DeltaEncoder.
+    """
+
+    def __init__(self, fileobj, loop=None, palette=None):
+        self.fileobj = fileobj
+        self.loop = loop
+        self.palette = palette
+        self.frame_count = 0
+        self._size = None
+        self._encoder = DeltaEncoder(palette) if palette is not None else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write_header(self, width, height):
+        if self.palette is None:
+            # Logical screen descriptor without a global color table.
+            header = b"GIF89a" + struct.pack("<HHBBB", width, height, 0, 0, 0)
+        else:
+            # 256-entry global color table, background color index 0.
+            header = b"GIF89a" + struct.pack("<HHBBB", width, height, 0xF7, 0, 0)
+            header += _palette_bytes(self.palette)
+        if self.loop is not None:
+            header += b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", self.loop) + b"\x00"
+        self.fileobj.write(header)
+
+    def append(self, frame, duration):
+        """Encode an (h, w, 3) or (h, w, 4) uint8 frame shown for `duration` seconds."""
+        if self._encoder is not None:
+            self.append_encoded(*self._encoder.encode(frame, duration))
+        else:
+            self.append_encoded(*encode_frame(frame, duration))
+
+    def append_encoded(self, data, size):
+        """Write a frame already encoded by encode_frame() or a DeltaEncoder."""
+        if self._size is None:
+            self._size = size
+            self._write_header(*size)
+        elif size != self._size:
+            raise ValueError("All GIF frames must have the same size.")
+        self.fileobj.write(data)
+        self.frame_count += 1
+
+    def close(self):
+        if self._size is not None:
+            self.fileobj.write(b";")
+            self._size = None
+        self.fileobj.flush()
+
+
+def encode_frame(frame, duration):
+    """
+    Quantize and LZW-encode one frame shown for `duration` seconds.
+    Returns (data, (width, height)); data is the frame's graphic control
+    extension, image descriptor, local color table and image data. Frames
+    encode independently, so this can run in worker processes.
+    """
+    image = Image.fromarray(frame).convert("RGB").convert("P", palette=Image.Palette.ADAPTIVE)
+    data = b"".join(GifImagePlugin.getdata(image, duration=round(duration * 1000),
+                                           include_color_table=True))
+    return data, image.size
+
+
+def ramp_levels(n_colors, n_alphas=0):
+    """Blend levels per color ramp_palette gives n_colors colors, or 0 when it returns None."""
+    levels = min(PALETTE_RAMP_LEVELS, (MAX_PALETTE_COLORS - 1) // max(n_colors, 1) - n_alphas)
+    return levels if levels >= MIN_PALETTE_RAMP_LEVELS else 0
+
+
+def ramp_palette(background, colors, max_alpha=1.0, alphas=()):
+    """
+    Global palette for lines drawn over a solid background: the background,
+    then for each line color a ramp of blends from the background toward it,
+    up to max_alpha, where anti-aliased edges and translucent strokes fall,
+    plus the exact blends at each of alphas (such as a faded stroke's alpha).
+    Colors are RGB tuples of 0-255 ints. Ramps get shorter as colors are
+    added; once they would drop below MIN_PALETTE_RAMP_LEVELS levels, None
+    is returned and the frames should get adaptive palettes instead.
+    """
+    background = np.array(background, dtype=np.float64)
+    colors = np.array(colors, dtype=np.float64).reshape(-1, 3)
+    levels = ramp_levels(len(colors), len(alphas))
+    if not levels:
+        return None
+    fractions = np.concatenate((max_alpha * np.arange(1, levels + 1) / levels, alphas))
+    ramps = background + (colors[:, None] - background) * fractions[:, None]
+    palette = [tuple(int(c) for c in background.round())]
+    for color in ramps.reshape(-1, 3).round().astype(int):
+        color = tuple(int(c) for c in color)
+        if color not in palette:
+            palette.append(color)
+    return palette
+
+
+def _palette_bytes(palette):
+    data = b"".join(bytes(color) for color in palette)
+    return data.ljust(768, b"\0")
+
+
+def _changed_pixels(frame, previous):
+    if frame.ndim == 3 and frame.shape[2] == 4 and frame.flags.c_contiguous:
+        # Compare whole RGBA pixels as 32-bit words.
+        return frame.view(np.uint32)[..., 0] != previous.view(np.uint32)[..., 0]
+    return np.any(frame != previous, axis=2)
+
+
+class DeltaEncoder:
+    """
+    Encode frames against a fixed global palette, each as only the bounding
+    box of the pixels that changed since the previous frame.
+
+    Frames use disposal 1 (left in place), so the decoder composites each
+    one over the last; pixels in the box whose palette index did not change
+    are written as TRANSPARENT_INDEX, which LZW packs into long runs. The
+    first frame is encoded whole. Frames are mapped to the nearest palette
+    color without dithering, so unchanged areas stay unchanged.
+    """
+
+    def __init__(self, palette):
+        if len(palette) > MAX_PALETTE_COLORS:
+            raise ValueError(f"A global palette holds at most {MAX_PALETTE_COLORS} colors.")
+        self._palette_image = Image.new("P", (1, 1))
+        self._palette_image.putpalette([c for color in palette for c in color])
+        self._previous = None
+        self._indices = None
+
+    def encode(self, frame, duration):
+        """Encode the next frame; returns (data, (width, height)) like encode_frame()."""
+        height, width = frame.shape[:2]
+        params = {'duration': round(duration * 1000), 'disposal': 1}
+        if self._previous is None or self._previous.shape != frame.shape:
+            y0, y1, x0, x1 = 0, height, 0, width
+            self._previous = frame.copy()
+            self._indices = np.empty((height, width), dtype=np.uint8)
+            keyframe = True
+        else:
+            changed = _changed_pixels(frame, self._previous)
+            rows = np.flatnonzero(changed.any(axis=1))
+            if not len(rows):
+                # Nothing changed: a single transparent pixel still carries the delay.
+                image = Image.new("L", (1, 1), TRANSPARENT_INDEX)
+                data = GifImagePlugin.getdata(image, transparency=TRANSPARENT_INDEX, **params)
+                return b"".join(data), (width, height)
+            cols = np.flatnonzero(changed.any(axis=0))
+            y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+            self._previous[y0:y1, x0:x1] = frame[y0:y1, x0:x1]
+            keyframe = False
+        crop = Image.fromarray(np.ascontiguousarray(frame[y0:y1, x0:x1, :3]))
+        indices = np.asarray(crop.quantize(palette=self._palette_image, dither=Image.Dither.NONE))
+        shown = self._indices[y0:y1, x0:x1]
+        if keyframe:
+            written = indices
+        else:
+            written = np.where(indices == shown, TRANSPARENT_INDEX, indices).astype(np.uint8)
+            params['transparency'] = TRANSPARENT_INDEX
+        shown[:] = indices
+        data = GifImagePlugin.getdata(Image.fromarray(written), offset=(int(x0), int(y0)),
+                                      **params)
+        return b"".join(data), (width, height)
+
+
+def write_gif(frames, fileobj, loop=None, encoded=False, palette=None):
+    """
+    Stream (frame, duration) pairs from an iterable into fileobj as a GIF.
+    Each frame is encoded before the next one is requested, so a generator
+    may reuse its frame buffer. With encoded=True the iterable yields
+    (data, size) pairs from encode_frame() or a DeltaEncoder instead.
+    With a palette, frames are delta-encoded against it (or, when already
+    encoded, were encoded against it).
+    Returns the number of frames written.
+    """
+    with GifStreamWriter(fileobj, loop=loop, palette=palette) as writer:
+        append = writer.append_encoded if encoded else writer.append
+        for item in frames:
+            append(*item)
+    return writer.frame_count
@@ -0,0 +1,229 @@
+import numpy as np
+from PIL import Image, ImageDraw, ImageColor
+
+# Figure layout shared with the matplotlib backend: a 15x15 inch figure whose
+# axes box uses matplotlib's default subplot margins.
+FIGURE_INCHES = 15
+AXES_BOX = (0.125, 0.11, 0.9, 0.88)  # left, bottom, right, top as figure fractions
+SUPERSAMPLE = 3  # Lines are drawn at this scale and box-filtered down for anti-aliasing
+
+
+class RasterCanvas:
+    """
+    Turtle frame renderer that draws polylines straight into a NumPy buffer.
+
+    Implements the same canvas interface as the matplotlib backend: lines are
+    added, updated and restyled by handle, and capture() returns the frame as
+    an (h, w, 4) uint8 array. Each line is drawn as one anti-aliased coverage
+    mask (Pillow at SUPERSAMPLE scale, then box-filtered), so a line never
+    darkens where it overlaps itself, and is alpha-blended over the layers
+    below it, clipped to the axes box. The composite of the leading lines that
+    did not change since the previous frame is kept as a base layer and reused
+    while the axis limits stay the same. Changed lines keep their coverage
+    between frames: a line that only grew adds the coverage of its new
+    segments (max-combined, so a few edge pixels can differ from a full
+    redraw), and only the regions that changed are restored from the base and
+    re-blended, so a frame costs about as much as its new segment.
+    """
+
+    # Frames depend on the ones drawn since the axis limits last changed;
+    # render_frames replays those when it starts mid-path.
+    incremental = True
+
+    def __init__(self, dpi, bg_color):
+        self.size = int(FIGURE_INCHES * dpi)
+        self.points_to_px = dpi / 72
+        left, bottom, right, top = AXES_BOX
+        self.box = (left * self.size, (1 - top) * self.size,
+                    right * self.size, (1 - bottom) * self.size)
+        self.lines = []
+        self.limits = None
+        self._next_id = 0
+        self._dirty = set()
+        self._base_key = None
+        # RGBA throughout so resets and restores are plain contiguous copies.
+        self._blank = np.full((self.size, self.size, 4), 255, dtype=np.uint8)
+        self._blank[..., :3] = ImageColor.getrgb(bg_color)
+        self._base = self._blank.copy()
+        self._frame = self._blank.copy()
+        self._changed = []
+
+    def add_line(self, x, y, color, linewidth, alpha):
+        line = {'id': self._next_id, 'x': x, 'y': y,
+                'color': np.array(color[:3], dtype=np.float32) * 255,
+                'linewidth': linewidth, 'alpha': alpha}
+        self._next_id += 1
+        self.lines.append(line)
+        self._dirty.add(line['id'])
+        return line
+
+    def set_line_data(self, line, x, y):
+        line['x'], line['y'] = x, y
+        self._dirty.add(line['id'])
+
+    def set_line_style(self, line, linewidth, alpha):
+        line['linewidth'], line['alpha'] = linewidth, alpha
+        self._dirty.add(line['id'])
+
+    def remove_line(self, line):
+        self.lines.remove(line)
+        self._dirty.add(line['id'])
+
+    def set_limits(self, xmin, xmax, ymin, ymax):
+        # A path that never moves (step_length 0) has equal limits; widen them
+        # as matplotlib does so the pixel mapping stays finite.
+        self.limits = _nonsingular(xmin, xmax) + _nonsingular(ymin, ymax)
+
+    def capture(self):
+        # Lines before the first changed one form the cached base layer; only
+        # the changed lines are composited on top, region by region.
+        stable = 0
+        while stable < len(self.lines) and self.lines[stable]['id'] not in self._dirty:
+            stable += 1
+        changed = self.lines[stable:]
+        key = (self.limits, tuple(line['id'] for line in self.lines[:stable]))
+        base_limits, base_ids = self._base_key or (None, ())
+        if key[0] == base_limits and key[1][:len(base_ids)] == base_ids:
+            # Same limits, and any newly stable lines were changed lines of the
+            # previous frame: add their coverage to the base instead of redrawing.
+            for line in self.lines[len(base_ids):stable]:
+                self._update_coverage(line)
+                self._blend(self._base, line, line['cov_bbox'])
+            self._base_key = key
+            changed_ids = {line['id'] for line in changed}
+            regions = [line['cov_bbox'] for line in self._changed if line['id'] not in changed_ids]
+            for line in changed:
+                regions += self._update_coverage(line)
+        else:
+            np.copyto(self._base, self._blank)
+            for line in self.lines[:stable]:
+                self._stroke(self._base, line)
+            self._base_key = key
+            np.copyto(self._frame, self._base)
+            regions = [region for line in changed for region in self._update_coverage(line)]
+        for region in regions:
+            if region is None:
+                continue
+            y0, y1, x0, x1 = region
+            self._frame[y0:y1, x0:x1] = self._base[y0:y1, x0:x1]
+            for line in changed:
+                self._blend(self._frame, line, region)
+        for line in self.lines[:stable]:
+            line.pop('coverage', None)
+        self._changed = changed
+        self._dirty.clear()
+        return self._frame
+
+    def close(self):
+        self.lines = []
+        self._changed = []
+
+    def _to_pixels(self, x, y):
+        xmin, xmax, ymin, ymax = self.limits
+        left, top, right, bottom = self.box
+        px = left + (np.asarray(x) - xmin) * ((right - left) / (xmax - xmin))
+        py = bottom - (np.asarray(y) - ymin) * ((bottom - top) / (ymax - ymin))
+        return px, py
+
+    def _update_coverage(self, line):
+        """
+        Bring the line's full-canvas coverage up to date; returns the regions
+        of the frame it changed. A line that only grew since its last update
+        gets just the coverage of its new segments, max-combined in.
+        """
+        x, y = np.asarray(line['x']), np.asarray(line['y'])
+        state = (self.limits, line['linewidth'], line['alpha'])
+        drawn = len(line.get('drawn_x', ()))
+        if ('coverage' in line and line['state'] == state and line['alpha'] > 0 and 2 <= drawn <= len(x)
+                and np.array_equal(x[:drawn], line['drawn_x']) and np.array_equal(y[:drawn], line['drawn_y'])):
+            if drawn == len(x):
+                return []
+            # Start one segment back so the joint at the old end is drawn too.
+            regions = [self._add_coverage(line, x[drawn - 2:], y[drawn - 2:])]
+        else:
+            regions = [line.get('cov_bbox')]
+            line['coverage'] = np.zeros((self.size, self.size), dtype=np.uint8)
+            line['cov_bbox'] = None
+            if len(x) >= 2 and line['alpha'] > 0:
+                self._add_coverage(line, x, y)
+            regions.append(line['cov_bbox'])
+        line['state'], line['drawn_x'], line['drawn_y'] = state, x, y
+        return regions
+
+    def _line_mask(self, x, y, linewidth):
+        """Anti-aliased coverage of a polyline: ((y0, y1, x0, x1), mask), or (None, None)."""
+        px, py = self._to_pixels(x, y)
+        width = linewidth * self.points_to_px
+        pad = width / 2 + 1
+        left, top, right, bottom = self.box
+        x0 = max(int(np.floor(px.min() - pad)), int(left))
+        y0 = max(int(np.floor(py.min() - pad)), int(top))
+        x1 = min(int(np.ceil(px.max() + pad)), int(np.ceil(right)))
+        y1 = min(int(np.ceil(py.max() + pad)), int(np.ceil(bottom)))
+        if x1 <= x0 or y1 <= y0:
+            return None, None
+        mask = Image.new("L", ((x1 - x0) * SUPERSAMPLE, (y1 - y0) * SUPERSAMPLE), 0)
+        points = np.column_stack(((px - x0) * SUPERSAMPLE, (py - y0) * SUPERSAMPLE))
+        ImageDraw.Draw(mask).line(points.ravel().tolist(), fill=255,
+                                  width=max(1, round(width * SUPERSAMPLE)), joint="curve")
+        return (y0, y1, x0, x1), np.asarray(mask.reduce(SUPERSAMPLE))
+
+    def _add_coverage(self, line, x, y):
+        bbox, mask = self._line_mask(x, y, line['linewidth'])
+        if bbox is not None:
+            y0, y1, x0, x1 = bbox
+            region = line['coverage'][y0:y1, x0:x1]
+            np.maximum(region, mask, out=region)
+            line['cov_bbox'] = _union(line['cov_bbox'], bbox)
+        return bbox
+
+    def _stroke(self, canvas, line):
+        """Blend one line into canvas without keeping its coverage."""
+        if len(line['x']) < 2 or line['alpha'] <= 0:
+            return
+        bbox, mask = self._line_mask(line['x'], line['y'], line['linewidth'])
+        if bbox is not None:
+            _blend_mask(canvas, bbox, mask, line)
+
+    def _blend(self, canvas, line, region):
+        """Alpha-blend the line's kept coverage into canvas within region."""
+        if region is not None:
+            y0, y1, x0, x1 = region
+            _blend_mask(canvas, region, line['coverage'][y0:y1, x0:x1], line)
+
+
+def _covered_pixels(coverage):
+    """(ys, xs) of the nonzero pixels of a 2-D uint8 mask."""
+    # Scan eight pixels at a time as 64-bit words: a thin line covers few of them.
+    flat = np.ascontiguousarray(coverage).reshape(-1)
+    if len(flat) % 8:
+        flat = np.concatenate((flat, np.zeros(-len(flat) % 8, dtype=np.uint8)))
+    words = np.flatnonzero(flat.view(np.uint64))
+    index = (words[:, None] * 8 + np.arange(8)).ravel()
+    return np.divmod(index[flat[index] != 0], coverage.shape[1])
+
+
+def _blend_mask(canvas, region, coverage, line):
+    # Blend only the covered pixels; a thin line covers a small part of its box.
+    y0, y1, x0, x1 = region
+    ys, xs = _covered_pixels(coverage)
+    alpha = coverage[ys, xs].astype(np.float32) * (line['alpha'] / 255)
+    target = canvas[y0:y1, x0:x1, :3]
+    below = target[ys, xs].astype(np.float32)
+    target[ys, xs] = np.rint(below + (line['color'] - below) * alpha[:, None])
+
+
+def _nonsingular(lo, hi, expander=0.05, tiny=1e-15):
+    """(lo, hi) widened when (nearly) empty, like matplotlib.transforms.nonsingular."""
+    largest = max(abs(lo), abs(hi))
+    if largest < 1e6 / tiny * np.finfo(float).tiny:
+        return -expander, expander
+    if hi - lo <= largest * tiny:
+        return lo - expander * abs(lo), hi + expander * abs(hi)
+    return lo, hi
+
+
+def _union(a, b):
+    if a is None or b is None:
+        return a or b
+    return min(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])
@@ -0,0 +1,125 @@
+import errno
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+CACHE_VERSION = 5  # Bump when rendering changes so stale animations are not served
+
+
+def params_key(params):
+    """Canonical content hash of a render parameter dict."""
+    canonical = json.dumps({"version": CACHE_VERSION, "params": params},
+                           sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """
+    Size-bounded, content-addressed disk cache of encoded animations.
+
+    Entries are stored as <key><suffix> in cache_dir. Recency is kept in memory
+    and mirrored to file mtimes, so the LRU order survives restarts. Once the
+    total size exceeds max_bytes the least recently used entries are evicted.
+    The directory is scanned on first use (or an explicit load()), not when
+    the cache is created.
+    """
+
+    def __init__(self, cache_dir, max_bytes, suffix=".gif"):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def load(self):
+        """Scan the cache directory for existing entries, if not done yet."""
+        with self._lock:
+            if self._loaded:
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            found = []
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(self.suffix):
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                    found.append((stat.st_mtime, name[:-len(self.suffix)], stat.st_size))
+            for _, key, size in sorted(found):
+                self._entries[key] = size
+                self._size += size
+            self._loaded = True
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def get(self, key, count=True):
+        """
+        Return the path of a cached entry, or None on a miss. Pass count=False
+        when serving a key the client already got from a counted lookup.
+        """
+        self.load()
+        path = self.path(key)
+        with self._lock:
+            if key in self._entries and not os.path.exists(path):
+                # Removed behind our back; forget it.
+                self._size -= self._entries.pop(key)
+            if key not in self._entries:
+                self.misses += count
+                return None
+            self.hits += count
+            self._entries.move_to_end(key)
+            os.utime(path)
+            return path
+
+    def put(self, key, src_path):
+        """Move the file at src_path into the cache under key and return its new path."""
+        self.load()
+        path = self.path(key)
+        size = os.path.getsize(src_path)
+        try:
+            os.replace(src_path, path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # src_path is on another filesystem: copy next to the entry first,
+            # so readers never see a partial file under the key.
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.copyfile(src_path, tmp_path)
+            os.replace(tmp_path, path)
+            os.remove(src_path)
+        with self._lock:
+            self._size += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep):
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, size = next(iter(self._entries.items()))
+            if key == keep:
+                break
+            del self._entries[key]
+            self._size -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        self.load()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,215 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import BrokenExecutor, ThreadPoolExecutor
+
+
+class QueueFull(RuntimeError):
+    """Raised by submit() when the queue already holds max_queued waiting jobs."""
+
+
+def _run_job(render, job_id, params, path, progress, options):
+    def report(done, total):
+        progress[job_id] = (done, total)
+    return render(params, path, report, **options)
+
+
+class RenderJobQueue:
+    """
+    Run render jobs in a bounded pool of worker processes.
+
+    submit() returns a job id straight away. Workers report frames rendered
+    out of frames expected through a manager dict shared with the web process,
+    and write the finished file (a GIF unless submitted with another suffix)
+    to result_dir (a new temporary directory under result_root unless given).
+    Finished jobs and their files are dropped job_ttl seconds after completion.
+
+    `render(params, path, report, **options)` must be a module-level function
+    so it can be sent to the workers; it calls report(done, total) as frames
+    are encoded. If given, `on_complete(path, info, result)` runs in the web
+    process once a job succeeds, with whatever render returned, and returns
+    the path its result should be served from; if it raises, the job is
+    reported as failed with that error. completed and failed count the jobs
+    that finished either way.
+
+    At most max_workers jobs run at once; with max_queued set, submit() raises
+    QueueFull instead of queueing more than that many jobs behind them.
+    With executor="thread" jobs run in threads of the web process instead,
+    which needs a thread-safe render but no process start-up or pickling.
+
+    Worker processes are started with start_method ("forkserver" where
+    available, else "spawn") rather than forked from the web process, whose
+    other threads may hold locks a forked child would inherit. If a worker
+    dies, its jobs fail and the next submit() starts a fresh pool (and a
+    fresh manager, if that died too). The fork server imports the modules
+    named in preload first, so workers start from whatever they load.
+    """
+
+    def __init__(self, render, max_workers=2, result_dir=None, job_ttl=3600,
+                 on_complete=None, max_queued=None, executor="process", result_root=None,
+                 start_method=None, preload=()):
+        if executor not in ("process", "thread"):
+            raise ValueError("Unknown executor.")
+        self.render = render
+        self.executor = executor
+        self.start_method = start_method
+        self.preload = list(preload)
+        self.on_complete = on_complete
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        # Absolute, so results resolve the same wherever they are opened from.
+        self.result_dir = os.path.abspath(result_dir) if result_dir is not None else None
+        self.result_root = os.path.abspath(result_root) if result_root is not None else None
+        self.job_ttl = job_ttl
+        self.jobs = {}
+        self.completed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._broken = False
+        self._manager = None
+        self._progress = None
+
+    def _start(self):
+        # Started lazily so importing the app neither spawns processes nor
+        # imports multiprocessing.
+        if self._executor is None:
+            if self.result_dir is None:
+                if self.result_root is not None:
+                    os.makedirs(self.result_root, exist_ok=True)
+                self.result_dir = tempfile.mkdtemp(prefix="collatz_renders_", dir=self.result_root)
+            if self.executor == "thread":
+                self._progress = {}
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            else:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                start_method = self.start_method
+                if start_method is None:
+                    start_method = ("forkserver" if "forkserver" in multiprocessing.get_all_start_methods()
+                                    else "spawn")
+                context = multiprocessing.get_context(start_method)
+                if start_method == "forkserver" and self.preload:
+                    context.set_forkserver_preload(self.preload)
+                if self._manager is None or not self._manager_alive():
+                    if self._manager is not None:
+                        self._manager.shutdown()
+                    self._manager = context.Manager()
+                    self._progress = self._manager.dict()
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    def _manager_alive(self):
+        try:
+            len(self._progress)
+        except (EOFError, OSError):
+            return False
+        return True
+
+    def _restart(self):
+        # A worker that died (killed for running out of memory, say) breaks the pool for good.
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._broken = False
+        self._start()
+
+    def _submit_job(self, job, job_id, params, options):
+        executor = self._executor
+        job['future'] = executor.submit(_run_job, self.render, job_id, params,
+                                        job['path'], self._progress, options)
+        job['future'].add_done_callback(lambda future: self._finish(job, future, executor))
+
+    def submit(self, params, frames_total, info=None, suffix=".gif", options=None):
+        """
+        Queue a render and return its job id. `info` is echoed back by status();
+        `options` are passed to render as keyword arguments.
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            if self.max_queued is not None and self.pending() >= self.max_workers + self.max_queued:
+                raise QueueFull("The render queue is full; try again shortly.")
+            if self._broken:
+                self._restart()
+            else:
+                self._start()
+            self._purge()
+            path = os.path.join(self.result_dir, job_id + suffix)
+            job = {'path': path, 'frames_total': frames_total, 'info': info or {},
+                   'suffix': suffix, 'finished_at': None, 'error': None}
+            try:
+                self._submit_job(job, job_id, params, options or {})
+            except BrokenExecutor:
+                self._restart()
+                self._submit_job(job, job_id, params, options or {})
+            self.jobs[job_id] = job
+        return job_id
+
+    def _finish(self, job, future, executor):
+        try:
+            if future.exception() is not None:
+                # Runs on the pool's own thread, so leave the restart to the next submit().
+                if isinstance(future.exception(), BrokenExecutor) and executor is self._executor:
+                    self._broken = True
+                self.failed += 1
+                return
+            if self.on_complete is not None:
+                try:
+                    job['path'] = self.on_complete(job['path'], job['info'], future.result())
+                except Exception as e:
+                    # Done callbacks only get their exceptions logged; record it on the job.
+                    job['error'] = e
+                    self.failed += 1
+                    return
+            self.completed += 1
+        finally:
+            job['finished_at'] = time.time()
+
+    def pending(self):
+        """Number of jobs queued or running."""
+        return sum(1 for job in list(self.jobs.values()) if job['finished_at'] is None)
+
+    def status(self, job_id):
+        """Return a status dict for the job, or None if it is unknown."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        future = job['future']
+        try:
+            progress = self._progress.get(job_id)
+        except (EOFError, OSError):
+            # The manager died with the pool; a new one starts with the next submit().
+            progress = None
+        frames_done, frames_total = progress or (0, job['frames_total'])
+        error = None
+        # A job only counts as finished once on_complete has placed its result.
+        if job['finished_at'] is not None:
+            error = job['error'] or future.exception()
+            state = "error" if error is not None else "done"
+        else:
+            state = "running" if progress is not None else "queued"
+        status = dict(job['info'])
+        status.update({"status": state, "frames_done": frames_done,
+                       "frames_total": frames_total})
+        if error is not None:
+            status["error"] = str(error)
+        return status
+
+    def result_path(self, job_id):
+        """Return the output path of a finished job, or None if it is not ready."""
+        job = self.jobs.get(job_id)
+        if job is None or job['finished_at'] is None or job['error'] or job['future'].exception():
+            return None
+        return job['path']
+
+    def _purge(self):
+        cutoff = time.time() - self.job_ttl
+        for job_id, job in list(self.jobs.items()):
+            if job['finished_at'] is not None and job['finished_at'] < cutoff:
+                del self.jobs[job_id]
+                self._progress.pop(job_id, None)
+                try:
+                    # Only the job's own output; on_complete may have moved it elsewhere.
+                    os.remove(os.path.join(self.result_dir, job_id + job['suffix']))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,11 @@
+"""
+Preloaded by the fork server that starts render worker processes.
+
+Importing it loads the app and runs warm_up() once in the fork server, so
+every render worker forks with matplotlib imported and the Collatz store
+already read, sharing those pages copy-on-write instead of each worker
+reading the whole store on its first job.
+"""
+from creating_patterns import warm_up
+
+warm_up()
@@ -0,0 +1,119 @@
+import numpy as np
+
+from raster_renderer import AXES_BOX, FIGURE_INCHES
+
+
+def _num(value):
+    return f"{value:.6g}"
+
+
+def _seconds(value):
+    return f"{value:.3f}s"
+
+
+def _hex_color(color):
+    return "#{:02x}{:02x}{:02x}".format(*(round(c * 255) for c in color[:3]))
+
+
+def _points(x, y):
+    # SVG's y axis points down; flip so the picture matches the raster frames.
+    return " ".join(f"{_num(px)},{_num(0.0 - py)}" for px, py in zip(x, y))
+
+
+def _discrete(attribute, values, key_times, duration, begin=0.0):
+    key_times = ";".join(f"{t / duration:.6f}" for t in key_times)
+    return (f'<animate attributeName="{attribute}" begin="{_seconds(begin)}" '
+            f'dur="{_seconds(duration)}" calcMode="discrete" fill="freeze" '
+            f'values="{";".join(values)}" keyTimes="{key_times}"/>')
+
+
+def write_svg_animation(fileobj, paths, colors, durations, bg_color, dpi,
+                        current_style, finished_style):
+    """
+    Write the turtle animation as one self-contained animated SVG.
+
+    paths and colors come from compute_animation_geometry and path_colors, and
+    durations holds the durations in seconds of each path's frames, which show
+    the steps listed in its 'frames'. Every path
+    is a <polyline> written once and revealed step by step by a discrete
+    stroke-dashoffset animation; the view follows the same per-step limits
+    through an animated viewBox. Styles are (linewidth in points, alpha) pairs
+    for the line being drawn and for finished lines. The output grows with the
+    number of points rather than with frames times pixels.
+
+    The view keeps the drawing's aspect ratio (matplotlib stretches it to fill
+    the axes), so stroke widths stay round; they are rescaled per step to keep
+    a constant on-screen width while the view zooms.
+    """
+    size = FIGURE_INCHES * dpi
+    left, bottom, right, top = AXES_BOX
+    box_width, box_height = (right - left) * size, (top - bottom) * size
+    pixels_per_point = dpi / 72
+
+    starts = []
+    limits = []
+    elapsed = 0.0
+    for path, path_durations in zip(paths, durations):
+        starts.append(elapsed)
+        limits.append(path['limits'][path['frames']])
+        elapsed += float(np.sum(path_durations))
+    total = elapsed
+    limits = np.concatenate(limits)
+    key_times = np.concatenate([start + np.cumsum(d) - d for start, d in zip(starts, durations)])
+    views = [f"{_num(xmin)} {_num(-ymax)} {_num(xmax - xmin)} {_num(ymax - ymin)}"
+             for xmin, xmax, ymin, ymax in limits]
+    # User units per screen pixel under "meet" scaling, for each frame.
+    units_per_pixel = np.maximum((limits[:, 1] - limits[:, 0]) / box_width,
+                                 (limits[:, 3] - limits[:, 2]) / box_height)
+
+    def stroke_widths(linewidth):
+        widths = [_num(w) for w in units_per_pixel * linewidth * pixels_per_point]
+        return widths[0], _discrete("stroke-width", widths, key_times, total)
+
+    write = fileobj.write
+    write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{_num(size)}" height="{_num(size)}" '
+          f'viewBox="0 0 {_num(size)} {_num(size)}">\n')
+    write(f'<rect width="100%" height="100%" fill="{bg_color}"/>\n')
+    write(f'<svg x="{_num(left * size)}" y="{_num((1 - top) * size)}" width="{_num(box_width)}" '
+          f'height="{_num(box_height)}" viewBox="{views[0]}" preserveAspectRatio="xMidYMid meet">\n')
+    write(_discrete("viewBox", views, key_times, total) + "\n")
+
+    # Finished lines sit below the line being drawn, as in the raster frames.
+    # Mirror lines are dropped once their sequence ends, so they have no trace.
+    width, animation = stroke_widths(finished_style[0])
+    write(f'<g fill="none" stroke-linecap="square" stroke-linejoin="round" '
+          f'stroke-opacity="{finished_style[1]}" stroke-width="{width}">\n{animation}\n')
+    for idx, (path, color) in enumerate(zip(paths[:-1], colors)):
+        write(f'<polyline points="{_points(path["x"], path["y"])}" stroke="{_hex_color(color)}" '
+              f'visibility="hidden"><set attributeName="visibility" to="visible" '
+              f'begin="{_seconds(starts[idx + 1])}" fill="freeze"/></polyline>\n')
+    write('</g>\n')
+
+    width, animation = stroke_widths(current_style[0])
+    write(f'<g fill="none" stroke-linecap="square" stroke-linejoin="round" '
+          f'stroke-opacity="{current_style[1]}" stroke-width="{width}">\n{animation}\n')
+    for idx, (path, color, path_durations) in enumerate(zip(paths, colors, durations)):
+        begin = starts[idx]
+        duration = float(np.sum(path_durations))
+        if idx + 1 < len(paths):
+            shown = f'begin="{_seconds(begin)}" dur="{_seconds(duration)}"'
+        else:
+            shown = f'begin="{_seconds(begin)}" fill="freeze"'
+        lines = [(path['x'], path['y'])]
+        if path['mirror'] is not None:
+            lines.append(path['mirror'])
+        for x, y in lines:
+            drawn = np.concatenate(([0.0], np.cumsum(np.hypot(np.diff(x), np.diff(y)))))
+            length = drawn[-1]
+            # The frame for step i shows the first i + 1 segments.
+            offsets = [_num(length - d) for d in drawn[path['frames'] + 1]]
+            offsets[-1] = "0"
+            write(f'<polyline points="{_points(x, y)}" stroke="{_hex_color(color)}" '
+                  f'stroke-dasharray="{_num(length)} {_num(length)}" '
+                  f'stroke-dashoffset="{_num(length)}" visibility="hidden">'
+                  f'<set attributeName="visibility" to="visible" {shown}/>'
+                  + _discrete("stroke-dashoffset", offsets, np.cumsum(path_durations) - path_durations,
+                              duration, begin=begin)
+                  + '</polyline>\n')
+    write('</g>\n</svg>\n</svg>\n')